@@ -1,13 +1,18 @@
 # Oikos - Airbnb Clone Application
 # Main application file
 
+import os
 import streamlit as st
 from oikos_database import DatabaseManager
 from oikos_auth import UserManager, show_auth_page
+from oikos_sessions import SessionManager
 from oikos_properties import PropertyManager, show_property_listings, show_host_property
+from oikos_catalog import PropertyCatalog
 from oikos_bookings import BookingManager, show_user_bookings, show_booking_modal
 from oikos_reviews import ReviewManager, show_review_form
-from oikos_dashboard import show_dashboard
+from oikos_dashboard import show_dashboard, show_admin_page
+from oikos_querystats import QueryStats
+from oikos_profiling import RerunProfiler, profile_page, profiling_enabled
 from oikos_utils import load_css, init_session_state, populate_sample_data
 
 # Configure Streamlit page
@@ -18,20 +23,63 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize managers
+# Bootstrap: runs once per process. Schema init, migrations and sample data
+# happen here, never on a rerun.
 @st.cache_resource
 def get_managers():
-    db_manager = DatabaseManager()
+    query_stats = QueryStats(slow_ms=float(os.environ.get("OIKOS_SLOW_QUERY_MS", 50)))
+    db_manager = DatabaseManager(profile=os.environ.get("OIKOS_DB_PROFILE", "production"),
+                                 query_stats=query_stats)
     user_manager = UserManager(db_manager)
-    property_manager = PropertyManager(db_manager)
-    booking_manager = BookingManager(db_manager)
+    # OIKOS_CATALOG=0 sends every browse query to SQLite instead of the in-memory catalog
+    catalog = PropertyCatalog(db_manager) if os.environ.get("OIKOS_CATALOG", "1") != "0" else None
+    property_manager = PropertyManager(db_manager, catalog=catalog)
+    booking_manager = BookingManager(db_manager, property_manager)
     review_manager = ReviewManager(db_manager)
+    session_manager = SessionManager(db_manager)
+    populate_sample_data(user_manager, property_manager)
     
-    return db_manager, user_manager, property_manager, booking_manager, review_manager
+    return db_manager, user_manager, property_manager, booking_manager, review_manager, session_manager
+
+@st.cache_resource
+def get_image_cache():
+    # OIKOS_IMAGE_CACHE=0 hot-links every image_url as before
+    if os.environ.get("OIKOS_IMAGE_CACHE", "1") == "0":
+        return None
+    try:
+        from oikos_images import ImageCache
+        return ImageCache()
+    except (ImportError, OSError):
+        return None  # Pillow missing or a read-only checkout
+
+@st.cache_resource
+def get_photo_search(_db_manager, _image_cache):
+    # Optional: needs torch, torchvision and faiss; OIKOS_PHOTO_SEARCH=0 turns it off
+    if os.environ.get("OIKOS_PHOTO_SEARCH", "1") == "0":
+        return None
+    # Listing photos are only read through the image cache, which refuses non-public URLs
+    if _image_cache is None:
+        return None
+    try:
+        from oikos_photo_search import ListingPhotoSearch
+    except ImportError:
+        return None
+    # Listing photos are downloaded and embedded in a background thread, never during a rerun
+    return ListingPhotoSearch(_db_manager, image_cache=_image_cache).start()
+
+@st.cache_resource
+def get_profiler():
+    return RerunProfiler() if profiling_enabled() else None
+
+def is_admin(user) -> bool:
+    return user['username'] in os.environ.get("OIKOS_ADMIN_USERS", "").split(",")
 
 # Main application UI
-def show_main_app():
-    _, user_manager, property_manager, booking_manager, review_manager = get_managers()
+def show_main_app(user):
+    db_manager, user_manager, property_manager, booking_manager, review_manager, session_manager = get_managers()
+    profiler = get_profiler()
+    image_cache = get_image_cache()
+    photo_search = get_photo_search(db_manager, image_cache)
     
     # Initialize navigation state
     if 'nav_open' not in st.session_state:
@@ -52,7 +100,7 @@ def show_main_app():
     <div class="nav-panel" id="navPanel">
         <div style="text-align: center; margin-bottom: 30px;">
             <div style="font-size: 2rem; color: white; margin-bottom: 10px;">🏠 Oikos</div>
-            <div style="color: rgba(255,255,255,0.8); font-size: 0.9rem;">Welcome, {st.session_state.user['first_name']}! ✨</div>
+            <div style="color: rgba(255,255,255,0.8); font-size: 0.9rem;">Welcome, {user['first_name']}! ✨</div>
         </div>
         
         <a href="#" class="nav-item" onclick="setPage('home')">🏠 Browse Properties</a>
@@ -86,7 +134,7 @@ def show_main_app():
     """, unsafe_allow_html=True)
     
     # Navigation functionality (hidden buttons for Streamlit functionality)
-    col1, col2, col3, col4, col5 = st.columns(5)
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
     
     with col1:
         if st.button("🏠", key="nav_home_hidden", help="Browse Properties"):
@@ -110,10 +158,16 @@ def show_main_app():
     
     with col5:
         if st.button("🚪", key="logout_hidden", help="Logout"):
-            st.session_state.user = None
+            session_manager.revoke(st.session_state.session_token)
+            st.session_state.session_token = None
             st.session_state.page = 'home'
             st.rerun()
     
+    with col6:
+        if is_admin(user) and st.button("🛠️", key="nav_admin_hidden", help="Admin"):
+            st.session_state.page = 'admin'
+            st.rerun()
+    
     # Hide the navigation buttons with CSS
     st.markdown("""
     <style>
@@ -123,28 +177,37 @@ def show_main_app():
     </style>
     """, unsafe_allow_html=True)
     
-    # Main content based on selected page
-    if st.session_state.page == 'home':
-        show_property_listings(property_manager, booking_manager, review_manager)
-        
-        # Handle booking modal
-        if hasattr(st.session_state, 'show_booking') and st.session_state.show_booking:
-            from oikos_bookings import show_booking_modal
-            show_booking_modal(st.session_state.selected_property, booking_manager)
-            st.session_state.show_booking = False
+    # Main content based on selected page; timed per page when profiling is on
+    with profile_page(profiler, st.session_state.page):
+        if st.session_state.page == 'home':
+            show_property_listings(property_manager, booking_manager, review_manager, photo_search, image_cache)
             
-    elif st.session_state.page == 'bookings':
-        show_user_bookings(booking_manager, review_manager)
-        
-        # Handle review modal
-        if hasattr(st.session_state, 'show_review') and st.session_state.show_review:
-            from oikos_reviews import show_review_form
-            show_review_form(st.session_state.selected_booking, review_manager)
-            st.session_state.show_review = False
-    elif st.session_state.page == 'host':
-        show_host_property(property_manager)
-    elif st.session_state.page == 'dashboard':
-        show_dashboard(property_manager, booking_manager)
+            # Handle booking modal
+            if hasattr(st.session_state, 'show_booking') and st.session_state.show_booking:
+                from oikos_bookings import show_booking_modal
+                show_booking_modal(st.session_state.selected_property, booking_manager, user)
+                st.session_state.show_booking = False
+                
+        elif st.session_state.page == 'bookings':
+            show_user_bookings(booking_manager, review_manager, user, image_cache)
+            
+            # Handle review modal
+            if hasattr(st.session_state, 'show_review') and st.session_state.show_review:
+                from oikos_reviews import show_review_form
+                show_review_form(st.session_state.selected_booking, review_manager, user)
+                st.session_state.show_review = False
+        elif st.session_state.page == 'host':
+            show_host_property(property_manager, user)
+        elif st.session_state.page == 'dashboard':
+            show_dashboard(property_manager, booking_manager, user)
+        elif st.session_state.page == 'admin' and is_admin(user):
+            caches = {f"properties {name}": stats for name, stats in property_manager.cache_stats().items()}
+            caches['sessions'] = session_manager.cache_stats()
+            if property_manager.catalog is not None:
+                caches['catalog'] = property_manager.catalog.stats()
+            if image_cache is not None:
+                caches['images'] = image_cache.stats()
+            show_admin_page(db_manager, profiler, caches)
     
     # Professional Footer
     st.markdown("""
@@ -187,13 +250,13 @@ def main():
     load_css()
     init_session_state()
     
-    # Populate sample data on first run
-    populate_sample_data()
-    
-    if st.session_state.user is None:
-        show_auth_page()
+    _, user_manager, _, _, _, session_manager = get_managers()
+    user = session_manager.resolve(st.session_state.session_token)
+    if user is None:
+        st.session_state.session_token = None
+        show_auth_page(user_manager, session_manager)
     else:
-        show_main_app()
+        show_main_app(user)
 
 if __name__ == "__main__":
     main()
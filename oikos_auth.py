@@ -1,72 +1,161 @@
 # Oikos Authentication System
 import streamlit as st
 import hashlib
+import hmac
+import os
+import secrets
 import sqlite3
-from typing import Dict, Optional
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from oikos_cache import LRUCache
+
+# scrypt cost: ~16 MiB and a few tens of ms per hash on current hardware.
+# Raising these makes existing hashes get upgraded on the user's next login.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+# Fallback for OpenSSL builds without scrypt
+PBKDF2_ITERATIONS = 600_000
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2), dklen=32)
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    if hasattr(hashlib, 'scrypt'):
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+def verify_password(password: str, stored: str) -> Tuple[bool, bool]:
+    """Check a password against a stored hash; returns (matches, needs_rehash).
+    
+    Understands the current scrypt/PBKDF2 formats and the legacy unsalted
+    SHA-256 hex digests, which always need a rehash.
+    """
+    algorithm, _, params = stored.partition('$')
+    if algorithm == 'scrypt':
+        n, r, p, salt, digest = params.split('$')
+        n, r, p = int(n), int(r), int(p)
+        ok = hmac.compare_digest(_scrypt(password, bytes.fromhex(salt), n, r, p).hex(), digest)
+        return ok, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    if algorithm == 'pbkdf2_sha256':
+        iterations, salt, digest = params.split('$')
+        computed = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+        ok = hmac.compare_digest(computed.hex(), digest)
+        return ok, hasattr(hashlib, 'scrypt') or int(iterations) != PBKDF2_ITERATIONS
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, stored), True
+
+# Verified against when the username does not exist, so a miss costs as much as a hit
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+class LoginBusy(Exception):
+    pass
 
 class UserManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, kdf_workers: int = None, kdf_queue: int = None,
+                 verified_cache_size: int = 1024):
         self.db = db_manager
+        # The KDF is deliberately CPU-heavy: cap how many run at once (one per
+        # core by default) and how many logins may wait, instead of letting
+        # every Streamlit session thread hash in parallel.
+        workers = kdf_workers or os.cpu_count() or 1
+        self._kdf_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oikos-kdf")
+        # Also runs if a manager is dropped without close()
+        self._shutdown = weakref.finalize(self, self._kdf_pool.shutdown, wait=False)
+        self._kdf_slots = threading.BoundedSemaphore(workers + (kdf_queue if kdf_queue is not None else 4 * workers))
+        # username -> (HMAC of the password under a per-process key, stored hash)
+        # for credentials that already passed the KDF, so a repeat login skips it.
+        # Entries go stale by themselves when the stored hash changes.
+        self._verified = LRUCache(verified_cache_size)
+        self._verified_key = secrets.token_bytes(32)
+    
+    def close(self):
+        """Stop the KDF worker threads; hashing and logins fail afterwards."""
+        self._shutdown()
+    
+    def _credential_tag(self, username: str, password: str) -> bytes:
+        return hmac.new(self._verified_key, f"{username}\0{password}".encode(), 'sha256').digest()
+    
+    def _run_kdf(self, fn, *args, timeout: float = 10.0):
+        if not self._kdf_slots.acquire(timeout=timeout):
+            raise LoginBusy("Too many logins in progress; try again shortly")
+        try:
+            return self._kdf_pool.submit(fn, *args).result()
+        finally:
+            self._kdf_slots.release()
     
     def hash_password(self, password: str) -> str:
-        return hashlib.sha256(password.encode()).hexdigest()
+        return self._run_kdf(hash_password, password)
     
     def create_user(self, username: str, email: str, password: str, 
                    first_name: str, last_name: str, phone: str = None) -> bool:
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
             password_hash = self.hash_password(password)
             
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, first_name, last_name, phone)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (username, email, password_hash, first_name, last_name, phone))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO users (username, email, password_hash, first_name, last_name, phone)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (username, email, password_hash, first_name, last_name, phone))
+                conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        password_hash = self.hash_password(password)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, username, email, first_name, last_name, is_host, password_hash
+                FROM users 
+                WHERE username = ?
+            """, (username,))
+            user = cursor.fetchone()
         
-        cursor.execute("""
-            SELECT id, username, email, first_name, last_name, is_host
-            FROM users 
-            WHERE username = ? AND password_hash = ?
-        """, (username, password_hash))
+        stored = user[6] if user else _DUMMY_HASH
+        tag = self._credential_tag(username, password)
+        cached = self._verified.get(username)
+        if user and cached is not None and cached[1] == stored and hmac.compare_digest(cached[0], tag):
+            ok, needs_rehash = True, False
+        else:
+            ok, needs_rehash = self._run_kdf(verify_password, password, stored)
+        if not (user and ok):
+            return None
         
-        user = cursor.fetchone()
-        conn.close()
+        if not needs_rehash:
+            self._verified.put(username, (tag, stored))
+        else:
+            # Transparent upgrade of legacy SHA-256 (or outdated cost) hashes
+            upgraded = self.hash_password(password)
+            with self.db.connection() as conn:
+                cursor = conn.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                                      (upgraded, user[0], stored))
+                conn.commit()
+            if cursor.rowcount:
+                self._verified.put(username, (tag, upgraded))
         
-        if user:
-            return {
-                'id': user[0],
-                'username': user[1],
-                'email': user[2],
-                'first_name': user[3],
-                'last_name': user[4],
-                'is_host': user[5]
-            }
-        return None
+        return {
+            'id': user[0],
+            'username': user[1],
+            'email': user[2],
+            'first_name': user[3],
+            'last_name': user[4],
+            'is_host': user[5]
+        }
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, email, first_name, last_name, phone, is_host
-            FROM users WHERE id = ?
-        """, (user_id,))
-        
-        user = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, username, email, first_name, last_name, phone, is_host
+                FROM users WHERE id = ?
+            """, (user_id,))
+            user = cursor.fetchone()
         
         if user:
             return {
@@ -81,9 +170,7 @@ class UserManager:
         return None
 
 # Authentication UI
-def show_auth_page():
-    from oikos_database import DatabaseManager
-    
+def show_auth_page(user_manager, session_manager):
     # Beautiful Beach/Resort Hero Section with Travel Theme
     st.markdown("""
     <div style="background: linear-gradient(rgba(255, 107, 107, 0.6), rgba(78, 205, 196, 0.6)), url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1200 600"><defs><linearGradient id="bg" x1="0%" y1="0%" x2="100%" y2="100%"><stop offset="0%" style="stop-color:%2387CEEB;stop-opacity:1" /><stop offset="50%" style="stop-color:%2340E0D0;stop-opacity:1" /><stop offset="100%" style="stop-color:%23FFE4B5;stop-opacity:1" /></linearGradient></defs><rect width="1200" height="600" fill="url(%23bg)"/><circle cx="100" cy="100" r="30" fill="%23FFF" opacity="0.3"/><circle cx="300" cy="150" r="20" fill="%23FFF" opacity="0.2"/><circle cx="500" cy="80" r="25" fill="%23FFF" opacity="0.25"/><circle cx="700" cy="120" r="35" fill="%23FFF" opacity="0.15"/><circle cx="900" cy="90" r="28" fill="%23FFF" opacity="0.3"/><circle cx="1100" cy="140" r="22" fill="%23FFF" opacity="0.2"/></svg>') center/cover; min-height: 500px; display: flex; align-items: center; justify-content: center; padding: 6rem 2rem; margin: -1rem -1rem 3rem -1rem; border-radius: 0 0 40px 40px; text-align: center; color: white; position: relative; overflow: hidden;">
@@ -131,9 +218,6 @@ def show_auth_page():
         
         tab1, tab2 = st.tabs(["🏖️ Login", "🌴 Sign Up"])
     
-        db_manager = DatabaseManager()
-        user_manager = UserManager(db_manager)
-    
         with tab1:
             st.markdown("### 🔐 Welcome Back")
             st.markdown("Sign in to access your bookings and continue your journey")
@@ -150,9 +234,13 @@ def show_auth_page():
                 
                 if login_btn:
                     if username and password:
-                        user = user_manager.authenticate_user(username, password)
+                        try:
+                            user = user_manager.authenticate_user(username, password)
+                        except LoginBusy:
+                            user = None
+                            st.markdown('<div class="error-message">⏳ Lots of people are signing in right now. Please try again in a moment.</div>', unsafe_allow_html=True)
                         if user:
-                            st.session_state.user = user
+                            st.session_state.session_token = session_manager.create_session(user)
                             st.markdown('<div class="success-message">🌺 Welcome back! Redirecting to your dashboard...</div>', unsafe_allow_html=True)
                             st.rerun()
                         else:
@@ -194,9 +282,14 @@ def show_auth_page():
                 
                 if signup_btn:
                     if all([first_name, last_name, username, email, password]):
-                        if user_manager.create_user(username, email, password, first_name, last_name, phone):
+                        try:
+                            created = user_manager.create_user(username, email, password, first_name, last_name, phone)
+                        except LoginBusy:
+                            created = None
+                            st.markdown('<div class="error-message">⏳ Lots of people are signing in right now. Please try again in a moment.</div>', unsafe_allow_html=True)
+                        if created:
                             st.markdown('<div class="success-message">🎉 Account created! Welcome to paradise. Please login above.</div>', unsafe_allow_html=True)
-                        else:
+                        elif created is not None:
                             st.markdown('<div class="error-message">❌ Username or email already exists</div>', unsafe_allow_html=True)
                     else:
                         st.markdown('<div class="error-message">⚠️ Please fill in all required fields</div>', unsafe_allow_html=True)
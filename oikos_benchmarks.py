@@ -0,0 +1,794 @@
+# Oikos Benchmarks
+# Usage: python oikos_benchmarks.py <benchmark> [options] [--json]
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from oikos_database import DatabaseManager
+
+BENCHMARKS = {}
+
+def benchmark(name: str, **options):
+    """Register a benchmark; keyword defaults become --options on its subcommand."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, options)
+        return fn
+    return register
+
+@contextmanager
+def scratch_db(profile: str = "default", **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), profile=profile, **kwargs)
+        try:
+            yield db
+        finally:
+            db.close()
+
+def seed_catalog(db, listings: int, hosts: int = 10, seed: int = 7):
+    rng = random.Random(seed)
+    cities = ["New York", "London", "Paris", "Tokyo", "Sydney", "Rome", "Amsterdam", "Miami"]
+    types = ["Apartment", "House", "Loft", "Villa", "Studio", "Houseboat", "Suite"]
+    adjectives = ["Cozy", "Sunny", "Modern", "Historic", "Quiet", "Luxury", "Rustic", "Bright"]
+    features = ["canal", "beach", "garden", "skyline", "harbour", "park", "rooftop", "market"]
+    with db.connection() as conn:
+        conn.executemany("""
+            INSERT INTO users (username, email, password_hash, first_name, last_name, is_host)
+            VALUES (?, ?, 'x', 'Bench', 'Host', TRUE)
+        """, [(f"host{i}", f"host{i}@example.com") for i in range(hosts)])
+        rows = []
+        for i in range(listings):
+            city, kind, feature = rng.choice(cities), rng.choice(types), rng.choice(features)
+            rows.append((rng.randint(1, hosts), f"{rng.choice(adjectives)} {feature} {kind.lower()}",
+                         f"{kind} near the {feature} with {rng.choice(features)} views in {city}.",
+                         kind, city, f"{i} {feature.title()} Street", float(rng.randint(40, 600)),
+                         rng.randint(1, 8), rng.randint(1, 4)))
+        conn.executemany("""
+            INSERT INTO properties (host_id, title, description, property_type, city, country,
+                                    address, price_per_night, max_guests, bedrooms, bathrooms,
+                                    amenities, amenity_mask, image_url)
+            VALUES (?, ?, ?, ?, ?, 'Benchland', ?, ?, ?, ?, 1, '["WiFi"]', 1, NULL)
+        """, rows)
+        conn.commit()
+
+def seed_bookings(db, listings: int, bookings: int, seed: int = 11):
+    from oikos_migrations import rebuild_booking_calendar
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(bookings):
+        check_in = date(2030, 1, 1) + timedelta(days=rng.randint(0, 364))
+        nights = rng.randint(1, 10)
+        rows.append((rng.randint(1, listings), 1, str(check_in), str(check_in + timedelta(days=nights)),
+                     100.0 * nights, 2))
+    with db.connection() as conn:
+        conn.executemany("""
+            INSERT INTO bookings (property_id, guest_id, check_in_date, check_out_date, total_price, guest_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        rebuild_booking_calendar(conn)
+        conn.commit()
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+@benchmark("concurrent-reads", listings=2000, readers=4, seconds=5.0)
+def bench_concurrent_reads(listings: int, readers: int, seconds: float):
+    """Browse-query throughput while a writer thread keeps creating bookings."""
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    
+    results = []
+    for profile in ("default", "production"):
+        with scratch_db(profile, pool_size=readers + 1) as db:
+            seed_catalog(db, listings)
+            # Measure SQLite, not the browse result cache
+            property_manager = PropertyManager(db, browse_cache_size=0)
+            booking_manager = BookingManager(db)
+            stop = threading.Event()
+            latencies = [[] for _ in range(readers)]
+            writes = [0]
+            
+            def reader(slot):
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    property_manager.get_properties(city="Paris", max_price=150)
+                    latencies[slot].append(time.perf_counter() - start)
+            
+            def writer():
+                rng = random.Random(1)
+                day = date(2030, 1, 1)
+                while not stop.is_set():
+                    if booking_manager.create_booking(rng.randint(1, listings), 1, day,
+                                                      day + timedelta(days=2), 2):
+                        writes[0] += 1
+                    day += timedelta(days=2)
+            
+            threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+            threads.append(threading.Thread(target=writer))
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            
+            reads = [value for slot in latencies for value in slot]
+            results.append({
+                'profile': profile,
+                'reads_per_sec': round(len(reads) / seconds, 1),
+                'read_p50_ms': round(percentile(reads, 50) * 1000, 2),
+                'read_p99_ms': round(percentile(reads, 99) * 1000, 2),
+                'bookings_per_sec': round(writes[0] / seconds, 1),
+            })
+    return results
+
+@benchmark("booking-latency", sizes="1000,10000,100000", bookings=500)
+def bench_booking_latency(sizes: str, bookings: int):
+    """create_booking latency as the catalog grows; should stay flat."""
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    
+    results = []
+    for listings in (int(size) for size in sizes.split(",")):
+        with scratch_db("production") as db:
+            seed_catalog(db, listings)
+            booking_manager = BookingManager(db, PropertyManager(db))
+            rng = random.Random(listings)
+            day = date(2030, 1, 1)
+            latencies = []
+            for _ in range(bookings):
+                start = time.perf_counter()
+                booking_manager.create_booking(rng.randint(1, listings), 1, day, day + timedelta(days=2), 2)
+                latencies.append(time.perf_counter() - start)
+                day += timedelta(days=2)
+            
+            results.append({
+                'listings': listings,
+                'bookings': bookings,
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'cache_hit_ratio': booking_manager.properties._by_id.stats()['hit_ratio'],
+            })
+    return results
+
+@benchmark("search-latency", listings=1000000, repeats=20)
+def bench_search_latency(listings: int, repeats: int):
+    """Ranked full-text search (first page) combined with price/guest filters."""
+    from oikos_properties import PropertyManager
+    
+    searches = [
+        dict(search="canal houseboat amsterdam"),
+        dict(search="rooftop loft", max_price=250),
+        dict(search="quiet garden villa rome", min_guests=4),
+        dict(search="beach", max_price=150, min_guests=2),
+        dict(search="par"),
+    ]
+    with scratch_db("production") as db:
+        start = time.perf_counter()
+        seed_catalog(db, listings)
+        seed_seconds = time.perf_counter() - start
+        property_manager = PropertyManager(db, browse_cache_size=0)
+        
+        results = []
+        for filters in searches:
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                page, _ = property_manager.get_properties_page(**filters, limit=12)
+                latencies.append(time.perf_counter() - start)
+            results.append({
+                'listings': listings,
+                'filters': json.dumps(filters),
+                'hits_on_page': len(page),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'seed_s': round(seed_seconds, 1),
+            })
+    return results
+
+@benchmark("availability-search", listings=20000, bookings=100000, repeats=10)
+def bench_availability_search(listings: int, bookings: int, repeats: int):
+    """'Which Paris listings are free June 3-9?': per-property checks vs one calendar query."""
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    
+    check_in, check_out = date(2030, 6, 3), date(2030, 6, 9)
+    with scratch_db("production") as db:
+        seed_catalog(db, listings)
+        seed_bookings(db, listings, bookings)
+        property_manager = PropertyManager(db, browse_cache_size=0)
+        booking_manager = BookingManager(db, property_manager)
+        
+        def one_by_one():
+            return [prop for prop in property_manager.get_properties(city="Paris")
+                    if booking_manager.is_property_available(prop['id'], check_in, check_out)]
+        
+        def one_pass():
+            return property_manager.get_properties(city="Paris", check_in=check_in, check_out=check_out)
+        
+        results = []
+        for name, search in (("n_plus_one", one_by_one), ("calendar", one_pass)):
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                free = search()
+                latencies.append(time.perf_counter() - start)
+            results.append({
+                'strategy': name,
+                'listings': listings,
+                'bookings': bookings,
+                'free_listings': len(free),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            })
+    return results
+
+@benchmark("booking-stress", threads=16, attempts=4000, listings=20)
+def bench_booking_stress(threads: int, attempts: int, listings: int):
+    """Many threads racing overlapping bookings onto a few listings; must never double-book."""
+    from concurrent.futures import ThreadPoolExecutor
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    
+    results = []
+    for profile in ("default", "production"):
+        with scratch_db(profile, pool_size=threads, pool_timeout=60.0) as db:
+            seed_catalog(db, listings)
+            booking_manager = BookingManager(db, PropertyManager(db))
+            rng = random.Random(3)
+            # Short horizon so most attempts overlap an existing or in-flight booking
+            stays = [(rng.randint(1, listings), date(2030, 6, 1) + timedelta(days=rng.randint(0, 60)),
+                      rng.randint(1, 7)) for _ in range(attempts)]
+            
+            def attempt(stay):
+                property_id, check_in, nights = stay
+                return booking_manager.create_booking(property_id, 1, check_in,
+                                                      check_in + timedelta(days=nights), 2)
+            
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                outcomes = list(executor.map(attempt, stays))
+            elapsed = time.perf_counter() - start
+            
+            with db.connection() as conn:
+                overlaps = conn.execute("""
+                    SELECT COUNT(*) FROM bookings a JOIN bookings b
+                      ON a.property_id = b.property_id AND a.id < b.id
+                    WHERE a.status = 'confirmed' AND b.status = 'confirmed'
+                      AND a.check_in_date < b.check_out_date AND b.check_in_date < a.check_out_date
+                """).fetchone()[0]
+                booked_nights = conn.execute("SELECT COUNT(*) FROM booking_nights").fetchone()[0]
+                expected_nights = conn.execute("""
+                    SELECT COALESCE(SUM(julianday(check_out_date) - julianday(check_in_date)), 0)
+                    FROM bookings
+                """).fetchone()[0]
+            
+            results.append({
+                'profile': profile,
+                'threads': threads,
+                'attempts': attempts,
+                'booked': sum(outcomes),
+                'rejected': attempts - sum(outcomes),
+                'overlapping_pairs': overlaps,
+                'calendar_consistent': booked_nights == int(expected_nights),
+                'attempts_per_sec': round(attempts / elapsed, 1),
+            })
+            if overlaps:
+                raise AssertionError(f"{overlaps} overlapping bookings under the {profile} profile")
+    return results
+
+@benchmark("login-throughput", seconds=5.0, max_workers=0)
+def bench_login_throughput(seconds: float, max_workers: int):
+    """Logins/sec through the KDF worker pool at the configured scrypt cost (0 workers = all cores)."""
+    from oikos_auth import UserManager, SCRYPT_N, SCRYPT_R, SCRYPT_P
+    
+    cores = max_workers or os.cpu_count() or 1
+    results = []
+    with scratch_db("production") as db:
+        setup = UserManager(db, kdf_workers=1)
+        setup.create_user("bench", "bench@example.com", "password123", "Bench", "User")
+        setup.close()
+        for workers in sorted({1, cores}):
+            for cached in (False, True):
+                user_manager = UserManager(db, kdf_workers=workers,
+                                           verified_cache_size=1024 if cached else 0)
+                stop = threading.Event()
+                latencies = []
+                
+                def client():
+                    while not stop.is_set():
+                        start = time.perf_counter()
+                        assert user_manager.authenticate_user("bench", "password123")
+                        latencies.append(time.perf_counter() - start)
+                
+                # Oversubscribe clients so the pool, not the client count, is the limit
+                clients = [threading.Thread(target=client) for _ in range(4 * workers)]
+                for thread in clients:
+                    thread.start()
+                time.sleep(seconds)
+                stop.set()
+                for thread in clients:
+                    thread.join()
+                user_manager.close()
+                
+                results.append({
+                    'kdf': f"scrypt n={SCRYPT_N} r={SCRYPT_R} p={SCRYPT_P}",
+                    'workers': workers,
+                    'verified_cache': cached,
+                    'logins_per_sec': round(len(latencies) / seconds, 1),
+                    'logins_per_sec_per_core': round(len(latencies) / seconds / workers, 1),
+                    'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                })
+    return results
+
+@benchmark("css-payload", reruns=100)
+def bench_css_payload(reruns: int):
+    """Bytes load_css sends per rerun: original inline block vs inline-minified vs static link."""
+    import gzip
+    from oikos_utils import OIKOS_CSS, build_css_bundle, css_markup
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        name = build_css_bundle(tmp)
+        bundle = os.path.getsize(os.path.join(tmp, name))
+    payloads = {
+        'original inline': '<style>' + OIKOS_CSS + '</style>',
+        'inline (minified)': css_markup('inline'),
+        'static link': f'<link rel="stylesheet" href="app/static/{name}">',
+    }
+    results = []
+    for mode, html in payloads.items():
+        raw = len(html.encode())
+        results.append({
+            'mode': mode,
+            'bytes_per_rerun': raw,
+            'gzip_bytes_per_rerun': len(gzip.compress(html.encode())),
+            f'bytes_over_{reruns}_reruns': raw * reruns + (bundle if mode == 'static link' else 0),
+        })
+    return results
+
+@benchmark("startup-rerun", reruns=50)
+def bench_startup_rerun(reruns: int):
+    """Bootstrap cost, and the database work each rerun used to do vs. now."""
+    from oikos_auth import UserManager
+    from oikos_properties import PropertyManager
+    from oikos_utils import populate_sample_data
+    
+    statements = []
+    
+    class TracedDatabaseManager(DatabaseManager):
+        def get_connection(self):
+            conn = super().get_connection()
+            conn.set_trace_callback(statements.append)
+            return conn
+    
+    def ddl_count():
+        return sum(sql.lstrip().upper().startswith(('CREATE', 'ALTER', 'DROP')) for sql in statements)
+    
+    def run(label, open_db, repeat, seed=False):
+        statements.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            db = open_db()
+            users, properties = UserManager(db), PropertyManager(db)
+            if seed:
+                populate_sample_data(users, properties)
+            users.close()
+            db.close()
+        elapsed = time.perf_counter() - start
+        return {'phase': label, 'ms_each': round(elapsed / repeat * 1000, 2),
+                'statements_each': len(statements) // repeat, 'ddl_each': ddl_count() // repeat}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        
+        def forced():
+            # What every rerun did before: a fresh DatabaseManager re-running all DDL, then the seed check
+            db = TracedDatabaseManager(path)
+            db.init_database(force=True)
+            return db
+        
+        return [
+            run('cold bootstrap (new db, seed)', lambda: TracedDatabaseManager(path), 1, seed=True),
+            run('process start (existing db)', lambda: TracedDatabaseManager(path), reruns),
+            # Reruns now reuse the managers from the cached bootstrap: no database work at all
+            run('old per-rerun work', forced, reruns, seed=True),
+        ]
+
+@benchmark("bulk-import", listings=100000, baseline=2000, chunk_size=10000)
+def bench_bulk_import(listings: int, baseline: int, chunk_size: int):
+    """Listings/sec: create_property one at a time vs import_properties from a JSONL file."""
+    from oikos_properties import PropertyManager
+    from oikos_import import import_properties, read_records
+    
+    rng = random.Random(3)
+    cities = ["New York", "London", "Paris", "Tokyo", "Sydney", "Rome", "Amsterdam", "Miami"]
+    
+    def listing(i):
+        return {'host_id': 1, 'title': f"Listing {i}", 'description': "Bulk imported listing",
+                'property_type': "Apartment", 'city': rng.choice(cities), 'country': "Benchland",
+                'address': f"{i} Import Street", 'price_per_night': float(rng.randint(40, 600)),
+                'max_guests': rng.randint(1, 8), 'bedrooms': rng.randint(1, 4), 'bathrooms': 1,
+                'amenities': ["WiFi", "Kitchen"]}
+    
+    results = []
+    with scratch_db("production") as db:
+        seed_catalog(db, 0, hosts=1)
+        properties = PropertyManager(db)
+        start = time.perf_counter()
+        for i in range(baseline):
+            properties.create_property(**listing(i))
+        elapsed = time.perf_counter() - start
+        results.append({'method': 'create_property', 'rows': baseline, 'seconds': round(elapsed, 2),
+                        'rows_per_sec': round(baseline / elapsed)})
+    
+    with scratch_db("production") as db, tempfile.TemporaryDirectory() as tmp:
+        seed_catalog(db, 0, hosts=1)
+        path = os.path.join(tmp, "listings.jsonl")
+        with open(path, "w") as f:
+            for i in range(listings):
+                f.write(json.dumps(listing(i)) + "\n")
+        report = import_properties(db, read_records(path), chunk_size=chunk_size)
+        assert report['imported'] == listings, report['errors']
+        results.append({'method': 'import_properties', 'rows': listings, 'seconds': report['seconds'],
+                        'rows_per_sec': report['rows_per_sec']})
+    return results
+
+@benchmark("manager-suite", sizes="1000,10000,100000,1000000", repeats=20, budget=2.0, seed=42)
+def bench_manager_suite(sizes: str, repeats: int, budget: float, seed: int):
+    """Latency of every manager method on synthetic catalogs of each size.
+    
+    Each call runs ``repeats`` times or until ``budget`` seconds are used,
+    whichever comes first, so unbounded queries stay affordable at 1M.
+    """
+    from oikos_auth import UserManager
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    from oikos_reviews import ReviewManager
+    from oikos_sessions import SessionManager
+    from oikos_synth import SYNTH_PASSWORD, SYNTH_START, synthesize
+    
+    results = []
+    for listings in (int(size) for size in sizes.split(",")):
+        with scratch_db("production") as db:
+            start = time.perf_counter()
+            counts = synthesize(db, listings, seed=seed)
+            seed_seconds = time.perf_counter() - start
+            
+            users, properties = UserManager(db), PropertyManager(db, browse_cache_size=0)
+            bookings, reviews = BookingManager(db, properties), ReviewManager(db)
+            sessions = SessionManager(db)
+            rng = random.Random(seed)
+            with db.connection() as conn:
+                guest = conn.execute("SELECT guest_id FROM bookings GROUP BY guest_id "
+                                     "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+                username = conn.execute("SELECT username FROM users WHERE id = ?", (guest,)).fetchone()[0]
+                reviewed = conn.execute("SELECT property_id FROM reviews GROUP BY property_id "
+                                        "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+                last_id = conn.execute("SELECT MAX(id) FROM properties").fetchone()[0]
+            token = sessions.create_session(users.get_user_by_id(guest))
+            _, second_page = properties.get_properties_page(limit=12)
+            june = SYNTH_START.replace(month=6, day=3)
+            future = date(SYNTH_START.year + 2, 1, 1)
+            
+            def new_booking():
+                day = future + timedelta(days=rng.randint(0, 3000))
+                bookings.create_booking(rng.randint(1, last_id), guest, day, day + timedelta(days=2), 1)
+            
+            calls = {
+                'UserManager.authenticate_user': lambda: users.authenticate_user(username, SYNTH_PASSWORD),
+                'UserManager.get_user_by_id': lambda: users.get_user_by_id(rng.randint(1, guest)),
+                'SessionManager.resolve': lambda: sessions.resolve(token),
+                'PropertyManager.get_properties': lambda: properties.get_properties(),
+                'PropertyManager.get_properties(city, price, guests)': lambda: properties.get_properties(
+                    city="Lisbon", max_price=120, min_guests=2),
+                'PropertyManager.get_properties(amenities)': lambda: properties.get_properties(
+                    city="Kyoto", amenities=["Pool", "Gym"]),
+                'PropertyManager.get_properties(dates)': lambda: properties.get_properties(
+                    city="Paris", check_in=june, check_out=june + timedelta(days=5)),
+                'PropertyManager.get_properties(search)': lambda: properties.get_properties(
+                    search="canal loft amsterdam"),
+                'PropertyManager.get_properties_page': lambda: properties.get_properties_page(limit=12),
+                'PropertyManager.get_properties_page(next)': lambda: properties.get_properties_page(
+                    limit=12, cursor=second_page),
+                'PropertyManager.get_property_by_id': lambda: properties.get_property_by_id(
+                    rng.randint(1, last_id)),
+                'PropertyManager.create_property': lambda: properties.create_property(
+                    1, "Bench listing", "Created by the benchmark", "Apartment", "Paris", "France",
+                    "1 Bench Street", 100.0, 2, 1, 1, ["WiFi"]),
+                'PropertyManager.update_property': lambda: properties.update_property(
+                    rng.randint(1, last_id), price_per_night=float(rng.randint(40, 400))),
+                'BookingManager.is_property_available': lambda: bookings.is_property_available(
+                    rng.randint(1, last_id), june, june + timedelta(days=5)),
+                'BookingManager.create_booking': new_booking,
+                'BookingManager.get_user_bookings': lambda: bookings.get_user_bookings(guest),
+                'ReviewManager.get_property_reviews': lambda: reviews.get_property_reviews(reviewed),
+                'ReviewManager.create_review': lambda: reviews.create_review(
+                    reviewed, guest, 1, rng.randint(1, 5), "Benchmark review"),
+            }
+            for name, call in calls.items():
+                latencies = []
+                deadline = time.perf_counter() + budget
+                while len(latencies) < repeats and (not latencies or time.perf_counter() < deadline):
+                    start = time.perf_counter()
+                    call()
+                    latencies.append(time.perf_counter() - start)
+                results.append({
+                    'listings': listings,
+                    'method': name,
+                    'runs': len(latencies),
+                    'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                    'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                    'max_ms': round(max(latencies) * 1000, 3),
+                })
+            users.close()
+            results.append({'listings': listings, 'method': 'synthesize', 'runs': 1,
+                            'p50_ms': round(seed_seconds * 1000), 'p99_ms': round(seed_seconds * 1000),
+                            'max_ms': round(seed_seconds * 1000), 'rows': counts})
+    return results
+
+@benchmark("browse-cache", listings=20000, requests=5000, write_every=50, seed=3)
+def bench_browse_cache(listings: int, requests: int, write_every: int, seed: int):
+    """First-page browse latency for a keystroke-like filter stream, with and without the result cache.
+    
+    Filters are drawn with Zipf weights from city prefixes as they are typed,
+    price caps, guest counts and optional dates. Every ``write_every``
+    requests a listing is created, a stay is booked or a review is added.
+    """
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    from oikos_reviews import ReviewManager
+    
+    cities = ["New York", "London", "Paris", "Tokyo", "Sydney", "Rome", "Amsterdam", "Miami"]
+    stays = [(None, None), (date(2030, 6, 3), date(2030, 6, 9)), (date(2030, 8, 1), date(2030, 8, 4))]
+    combos = [dict(city=city[:length], max_price=price, min_guests=guests, check_in=stay[0], check_out=stay[1])
+              for city in cities for length in (1, 3, len(city))
+              for price in (1000, 300, 150) for guests in (1, 2, 4) for stay in stays]
+    random.Random(seed).shuffle(combos)
+    weights = [1 / rank for rank in range(1, len(combos) + 1)]
+    
+    results = []
+    with scratch_db("production") as db:
+        seed_catalog(db, listings)
+        seed_bookings(db, listings, listings * 2)
+        for cached in (False, True):
+            rng = random.Random(seed)
+            properties = PropertyManager(db, browse_cache_size=2048 if cached else 0)
+            bookings, reviews = BookingManager(db, properties), ReviewManager(db)
+            stream = rng.choices(combos, weights=weights, k=requests)
+            latencies = []
+            for i, filters in enumerate(stream, 1):
+                start = time.perf_counter()
+                properties.get_properties_page(**filters, limit=12)
+                latencies.append(time.perf_counter() - start)
+                if i % write_every == 0:
+                    kind = (i // write_every) % 3
+                    if kind == 0:
+                        city = rng.choice(cities)
+                        properties.create_property(1, "Bench listing", "Created by the benchmark", "Apartment",
+                                                   city, "Benchland", "1 Bench Street", rng.randint(40, 400),
+                                                   rng.randint(1, 6), 1, 1, ["WiFi"])
+                    elif kind == 1:
+                        day = date(2030, 1, 1) + timedelta(days=rng.randint(0, 364))
+                        bookings.create_booking(rng.randint(1, listings), 1, day, day + timedelta(days=3), 2)
+                    else:
+                        reviews.create_review(rng.randint(1, listings), 1, 1, rng.randint(1, 5), "Benchmark review")
+            stats = properties.cache_stats()['browse']
+            results.append({
+                'cache': cached,
+                'requests': requests,
+                'hit_ratio': stats['hit_ratio'],
+                'entries': stats['entries'],
+                'cache_kib': round(stats.get('bytes', 0) / 1024),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'total_s': round(sum(latencies), 2),
+            })
+    return results
+
+@benchmark("catalog-browse", sizes="10000,100000", repeats=20, seed=42)
+def bench_catalog_browse(sizes: str, repeats: int, seed: int):
+    """Browse pages answered by SQLite vs the columnar catalog, on synthetic catalogs."""
+    from oikos_properties import PropertyManager
+    from oikos_catalog import PropertyCatalog
+    from oikos_synth import synthesize
+    
+    browses = [
+        dict(),
+        dict(city="Paris", max_price=150),
+        dict(city="L", min_guests=4),
+        dict(amenities=["Pool", "Gym"]),
+        dict(max_price=60, min_guests=6, amenities=["WiFi"]),
+        dict(city="Rome", check_in=date(2030, 7, 1), check_out=date(2030, 7, 8)),
+    ]
+    results = []
+    for listings in (int(size) for size in sizes.split(",")):
+        with scratch_db("production") as db:
+            synthesize(db, listings, seed=seed)
+            catalog = PropertyCatalog(db)
+            start = time.perf_counter()
+            catalog.refresh()
+            load_seconds = time.perf_counter() - start
+            managers = {'sqlite': PropertyManager(db, browse_cache_size=0),
+                        'catalog': PropertyManager(db, browse_cache_size=0, catalog=catalog)}
+            for filters in browses:
+                for name, manager in managers.items():
+                    latencies = []
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        _, cursor = manager.get_properties_page(**filters, limit=12)
+                        manager.get_properties_page(**filters, limit=12, cursor=cursor)
+                        latencies.append((time.perf_counter() - start) / 2)
+                    results.append({
+                        'listings': listings,
+                        'filters': json.dumps(filters, default=str),
+                        'source': name,
+                        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                    })
+            stats = catalog.stats()
+            results.append({'listings': listings, 'filters': 'catalog load', 'source': 'catalog',
+                            'p50_ms': round(load_seconds * 1000, 1), 'p99_ms': round(load_seconds * 1000, 1),
+                            'kib': round(stats['bytes'] / 1024)})
+    return results
+
+@benchmark("image-index", vectors=100000, dim=1000, queries=200, k=10, nprobes="1,4,16,64",
+           ef_searches="16,64,256", store="", seed=5)
+def bench_image_index(vectors: int, dim: int, queries: int, k: int, nprobes: str, ef_searches: str,
+                      store: str, seed: int):
+    """Recall@k and single-query latency of each image index type against exact (flat) search.
+    
+    The synthetic vectors take vectors * dim * 4 bytes (400 MB by default);
+    --vectors 1000000 needs about 4 GB plus the indexes.
+    """
+    import faiss
+    import numpy as np
+    from simple_image_search import INDEX_KINDS, FeatureStore, build_index, index_params, set_search_params
+    
+    rng = np.random.default_rng(seed)
+    if store:
+        _, data = FeatureStore(store).vectors()
+    else:
+        # Clustered like image embeddings: similar photos sit close together
+        centers = rng.standard_normal((max(1, vectors // 100), dim), dtype=np.float32) * 4
+        data = np.empty((vectors, dim), dtype=np.float32)
+        for start in range(0, vectors, 100000):
+            count = min(100000, vectors - start)
+            data[start:start + count] = centers[rng.integers(len(centers), size=count)] \
+                + rng.standard_normal((count, dim), dtype=np.float32)
+    # Queries are perturbed copies of stored vectors, like a re-taken photo
+    picks = rng.integers(len(data), size=queries)
+    query_vectors = data[picks] + 0.3 * rng.standard_normal((queries, data.shape[1]), dtype=np.float32)
+    
+    results = []
+    truth = None
+    for kind in INDEX_KINDS:
+        start = time.perf_counter()
+        index = build_index(data, kind)
+        build_seconds = time.perf_counter() - start
+        params = index_params(kind, *data.shape)
+        size = len(faiss.serialize_index(index))
+        if kind.startswith('ivf'):
+            settings = [('nprobe', int(value)) for value in nprobes.split(",")]
+        elif kind == 'hnsw':
+            settings = [('ef_search', int(value)) for value in ef_searches.split(",")]
+        else:
+            settings = [(None, None)]
+        for knob, value in settings:
+            set_search_params(index, **({knob: value} if knob else {}))
+            found, latencies = [], []
+            for query in query_vectors:
+                start = time.perf_counter()
+                _, ids = index.search(query[None, :], k)
+                latencies.append(time.perf_counter() - start)
+                found.append(ids[0])
+            if truth is None:
+                truth = found
+            recall = np.mean([len(set(got) & set(want)) / k for got, want in zip(found, truth)])
+            results.append({
+                'index': kind,
+                'vectors': len(data),
+                'params': ",".join(f"{name}={v}" for name, v in params.items() if v) or '-',
+                'search': f"{knob}={value}" if knob else '-',
+                f'recall@{k}': round(float(recall), 3),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'build_s': round(build_seconds, 1),
+                'mib': round(size / 2 ** 20, 1),
+            })
+        del index
+    return results
+
+@benchmark("image-embedding", images=256, modes="eager,channels-last,torchscript,compile,int8",
+           batch_size=32, threads=0, interop_threads=0, shards="1,2,4", shard_mode="torchscript", seed=9)
+def bench_image_embedding(images: int, modes: str, batch_size: int, threads: int, interop_threads: int,
+                          shards: str, shard_mode: str, seed: int):
+    """ResNet18 embedding throughput (images/sec) per CPU inference mode, and drift from eager float32."""
+    import numpy as np
+    import torch
+    from PIL import Image
+    import simple_image_search as search
+    
+    search.configure_inference(threads=threads or None, interop_threads=interop_threads or None)
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Smooth random photos at a typical listing size, decoded like real ones
+        paths = []
+        for i in range(images):
+            low = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+            path = os.path.join(tmp, f"{i:05d}.jpg")
+            Image.fromarray(low).resize((1024, 768), Image.BICUBIC).save(path, quality=85)
+            paths.append(path)
+        
+        def run(mode, shard_count):
+            search.configure_inference(mode, shards=shard_count)
+            list(search.embed_files(paths[:batch_size], batch_size))   # load, trace or compile
+            start = time.perf_counter()
+            vectors = dict(search.embed_files(paths, batch_size))
+            return time.perf_counter() - start, np.stack([vectors[i] for i in range(len(paths))])
+        
+        def neighbours(matrix):
+            norms = (matrix ** 2).sum(axis=1)
+            distances = norms[:, None] + norms[None, :] - 2 * matrix @ matrix.T
+            return np.argsort(distances, axis=1)[:, 1:11]
+        
+        results = []
+        reference = None
+        runs = [(mode, 1) for mode in modes.split(",")]
+        runs += [(shard_mode, int(count)) for count in shards.split(",") if int(count) > 1]
+        for mode, shard_count in runs:
+            seconds, vectors = run(mode, shard_count)
+            if reference is None:
+                reference = vectors if mode == 'eager' else run('eager', 1)[1]
+            error = np.linalg.norm(vectors - reference, axis=1) / np.linalg.norm(reference, axis=1)
+            # Do the ten nearest neighbours of each image stay the same?
+            ours, theirs = neighbours(vectors), neighbours(reference)
+            overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ours, theirs)])
+            results.append({
+                'mode': mode,
+                'shards': shard_count,
+                'threads': torch.get_num_threads() if shard_count == 1 else 'split',
+                'images_per_sec': round(len(paths) / seconds, 1),
+                'mean_rel_drift': float(f"{error.mean():.2g}"),
+                'max_rel_drift': float(f"{error.max():.2g}"),
+                'knn10_overlap': round(float(overlap), 3),
+            })
+        search.configure_inference('eager', shards=1)
+    return results
+
+def print_results(results):
+    if not results:
+        return
+    columns = list(results[0])
+    widths = [max(len(str(col)), *(len(str(row.get(col, ''))) for row in results)) for col in columns]
+    print("  ".join(str(col).ljust(width) for col, width in zip(columns, widths)))
+    for row in results:
+        print("  ".join(str(row.get(col, '')).ljust(width) for col, width in zip(columns, widths)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Oikos benchmarks")
+    parser.add_argument("--json", action="store_true", help="emit machine-readable results")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    for name, (fn, options) in BENCHMARKS.items():
+        sub = subparsers.add_parser(name, help=(fn.__doc__ or "").strip())
+        for option, default in options.items():
+            sub.add_argument(f"--{option.replace('_', '-')}", type=type(default), default=default)
+    
+    args = parser.parse_args(argv)
+    fn, options = BENCHMARKS[args.benchmark]
+    results = fn(**{option: getattr(args, option) for option in options})
+    
+    if args.json:
+        print(json.dumps({'benchmark': args.benchmark, 'results': results}, indent=2))
+    else:
+        print_results(results)
+
+if __name__ == "__main__":
+    main()
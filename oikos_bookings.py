@@ -1,76 +1,87 @@
 # Oikos Booking Management
 import streamlit as st
 import datetime
+import sqlite3
 from datetime import date, timedelta
 from typing import Dict, List
+from oikos_profiling import phase
 
 class BookingManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, property_manager=None):
+        from oikos_properties import PropertyManager
         self.db = db_manager
+        self.properties = property_manager or PropertyManager(db_manager)
     
     def create_booking(self, property_id: int, guest_id: int, check_in_date: date,
                       check_out_date: date, guest_count: int) -> bool:
+        """Book the stay if every night is free; returns False on a date conflict.
+        
+        The availability check is the insert itself: booking_nights has one row
+        per (property, night), so a concurrent booking for any of the same
+        nights fails the primary key and the whole transaction rolls back.
+        """
         try:
-            # Check availability
-            if not self.is_property_available(property_id, check_in_date, check_out_date):
+            nights = (check_out_date - check_in_date).days
+            if nights <= 0:
                 return False
             
             # Calculate total price
-            from oikos_properties import PropertyManager
-            property_manager = PropertyManager(self.db)
-            property_data = property_manager.get_property_by_id(property_id)
+            property_data = self.properties.get_property_by_id(property_id)
             if not property_data:
                 return False
-            
-            nights = (check_out_date - check_in_date).days
             total_price = nights * property_data['price_per_night']
             
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO bookings (property_id, guest_id, check_in_date,
-                                    check_out_date, total_price, guest_count)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (property_id, guest_id, check_in_date, check_out_date,
-                  total_price, guest_count))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                # Take the write lock up front so the transaction never has to upgrade
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO bookings (property_id, guest_id, check_in_date,
+                                        check_out_date, total_price, guest_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (property_id, guest_id, str(check_in_date), str(check_out_date),
+                      total_price, guest_count))
+                booking_id = cursor.lastrowid
+                
+                # Reserve each night in the availability calendar
+                try:
+                    cursor.executemany("""
+                        INSERT INTO booking_nights (property_id, night, booking_id)
+                        VALUES (?, ?, ?)
+                    """, [(property_id, str(check_in_date + timedelta(days=n)), booking_id)
+                          for n in range(nights)])
+                except sqlite3.IntegrityError:
+                    conn.rollback()
+                    return False
+                conn.commit()
+            self.db.notify_change('bookings', property_id)
             return True
         except Exception as e:
             st.error(f"Error creating booking: {e}")
             return False
     
     def is_property_available(self, property_id: int, check_in: date, check_out: date) -> bool:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM bookings
-            WHERE property_id = ? AND status = 'confirmed'
-            AND NOT (check_out_date <= ? OR check_in_date >= ?)
-        """, (property_id, check_in, check_out))
-        
-        conflicts = cursor.fetchone()[0]
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM booking_nights
+                WHERE property_id = ? AND night >= ? AND night < ?
+            """, (property_id, str(check_in), str(check_out)))
+            conflicts = cursor.fetchone()[0]
         
         return conflicts == 0
     
     def get_user_bookings(self, user_id: int) -> List[Dict]:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT b.*, p.title, p.city, p.country, p.image_url
-            FROM bookings b
-            JOIN properties p ON b.property_id = p.id
-            WHERE b.guest_id = ?
-            ORDER BY b.created_at DESC
-        """, (user_id,))
-        
-        bookings = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT b.*, p.title, p.city, p.country, p.image_url
+                FROM bookings b
+                JOIN properties p ON b.property_id = p.id
+                WHERE b.guest_id = ?
+                ORDER BY b.created_at DESC
+            """, (user_id,))
+            bookings = cursor.fetchall()
         
         result = []
         for booking in bookings:
@@ -90,7 +101,7 @@ class BookingManager:
         
         return result
 
-def show_booking_modal(property_data, booking_manager):
+def show_booking_modal(property_data, booking_manager, user):
     st.markdown(f"### Book {property_data['title']}")
     
     with st.form(f"booking_form_{property_data['id']}"):
@@ -123,29 +134,31 @@ def show_booking_modal(property_data, booking_manager):
         book_btn = st.form_submit_button("Confirm Booking", use_container_width=True)
         
         if book_btn:
-            if booking_manager.is_property_available(property_data['id'], check_in, check_out):
-                if booking_manager.create_booking(
-                    property_data['id'], 
-                    st.session_state.user['id'],
-                    check_in, 
-                    check_out, 
-                    guest_count
-                ):
-                    st.success("Booking confirmed! Check your bookings page for details.")
-                else:
-                    st.error("Failed to create booking. Please try again.")
-            else:
+            # create_booking checks availability atomically; only re-check to explain a failure
+            if booking_manager.create_booking(
+                property_data['id'], 
+                user['id'],
+                check_in, 
+                check_out, 
+                guest_count
+            ):
+                st.success("Booking confirmed! Check your bookings page for details.")
+            elif not booking_manager.is_property_available(property_data['id'], check_in, check_out):
                 st.error("Property is not available for selected dates.")
+            else:
+                st.error("Failed to create booking. Please try again.")
 
-def show_user_bookings(booking_manager, review_manager):
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem 0;">
-        <h1 style="font-size: 2.5rem; font-weight: 700; color: #1a1a1a; margin-bottom: 0.5rem;">📋 My Bookings</h1>
-        <p style="font-size: 1.1rem; color: #666; margin-bottom: 2rem;">Manage your reservations and travel history</p>
-    </div>
-    """, unsafe_allow_html=True)
+def show_user_bookings(booking_manager, review_manager, user, image_cache=None):
+    with phase('widgets'):
+        st.markdown("""
+        <div style="text-align: center; padding: 2rem 0;">
+            <h1 style="font-size: 2.5rem; font-weight: 700; color: #1a1a1a; margin-bottom: 0.5rem;">📋 My Bookings</h1>
+            <p style="font-size: 1.1rem; color: #666; margin-bottom: 2rem;">Manage your reservations and travel history</p>
+        </div>
+        """, unsafe_allow_html=True)
     
-    bookings = booking_manager.get_user_bookings(st.session_state.user['id'])
+    with phase('data'):
+        bookings = booking_manager.get_user_bookings(user['id'])
     
     if not bookings:
         st.markdown("""
@@ -157,30 +170,29 @@ def show_user_bookings(booking_manager, review_manager):
         """, unsafe_allow_html=True)
         return
     
-    for booking in bookings:
-        with st.container():
-            col1, col2, col3 = st.columns([2, 2, 1])
-            
-            with col1:
-                if booking['image_url']:
-                    st.image(booking['image_url'], width=200)
-                else:
-                    st.image("https://via.placeholder.com/200x150?text=Property", width=200)
-            
-            with col2:
-                st.markdown(f"### {booking['property_title']}")
-                st.markdown(f"📍 {booking['city']}, {booking['country']}")
-                st.markdown(f"📅 {booking['check_in_date']} → {booking['check_out_date']}")
-                st.markdown(f"👥 {booking['guest_count']} guests")
-                st.markdown(f"💰 Total: ${booking['total_price']:.2f}")
+    with phase('widgets'):
+        for booking in bookings:
+            with st.container():
+                col1, col2, col3 = st.columns([2, 2, 1])
                 
-                status_color = {"confirmed": "🟢", "cancelled": "🔴", "completed": "🔵"}
-                st.markdown(f"Status: {status_color.get(booking['status'], '⚪')} {booking['status'].title()}")
-            
-            with col3:
-                if booking['status'] == 'confirmed' and booking['check_out_date'] < date.today():
-                    if st.button(f"Leave Review", key=f"review_{booking['id']}"):
-                        st.session_state.selected_booking = booking
-                        st.session_state.show_review = True
-            
-            st.divider()
+                with col1:
+                    image_url = booking['image_url'] or "https://via.placeholder.com/200x150?text=Property"
+                    st.image(image_cache.image_src(image_url) if image_cache else image_url, width=200)
+                
+                with col2:
+                    st.markdown(f"### {booking['property_title']}")
+                    st.markdown(f"📍 {booking['city']}, {booking['country']}")
+                    st.markdown(f"📅 {booking['check_in_date']} → {booking['check_out_date']}")
+                    st.markdown(f"👥 {booking['guest_count']} guests")
+                    st.markdown(f"💰 Total: ${booking['total_price']:.2f}")
+                    
+                    status_color = {"confirmed": "🟢", "cancelled": "🔴", "completed": "🔵"}
+                    st.markdown(f"Status: {status_color.get(booking['status'], '⚪')} {booking['status'].title()}")
+                
+                with col3:
+                    if booking['status'] == 'confirmed' and booking['check_out_date'] < date.today():
+                        if st.button(f"Leave Review", key=f"review_{booking['id']}"):
+                            st.session_state.selected_booking = booking
+                            st.session_state.show_review = True
+                
+                st.divider()
@@ -0,0 +1,104 @@
+# Oikos In-Process Caches
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def approx_size(obj) -> int:
+    """Rough deep size in bytes of a result made of dicts, lists, tuples and scalars."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key) + approx_size(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item) for item in obj)
+    return size
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss accounting.
+    
+    Optionally entries also expire ``ttl`` seconds after they are stored, and
+    the cache holds at most ``max_bytes`` as measured by ``sizeof`` (default
+    approx_size); values bigger than a quarter of that are not cached at all.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = None, max_bytes: int = None,
+                 sizeof=approx_size):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        # key -> (value, expires_at or None, size in bytes or 0)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                self._drop(key)
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return default
+    
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes // 4:
+            self.invalidate(key)
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats['evictions'] += 1
+    
+    def _drop(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._drop(key)
+    
+    def invalidate_many(self, keys) -> int:
+        with self._lock:
+            return sum(self._drop(key) for key in keys)
+    
+    def invalidate_where(self, predicate) -> int:
+        """Drop every entry for which ``predicate(key, value)`` is true."""
+        with self._lock:
+            doomed = [key for key, entry in self._entries.items() if predicate(key, entry[0])]
+            for key in doomed:
+                self._drop(key)
+            return len(doomed)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            stats = dict(self._stats, entries=len(self._entries),
+                         hit_ratio=round(self._stats['hits'] / lookups, 3) if lookups else 0.0)
+            if self.max_bytes:
+                stats['bytes'] = self._bytes
+            return stats
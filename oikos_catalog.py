@@ -0,0 +1,222 @@
+# Oikos Columnar Catalog
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import numpy as np
+from oikos_properties import AMENITY_BITS, amenity_mask
+
+# Seconds between full reloads, which pick up writes made by other processes
+CATALOG_RESYNC = 300
+# Candidates checked against booking_nights per round when filtering by dates
+AVAILABILITY_BATCH = 256
+ID_BITS = 31
+
+COLUMNS = """SELECT id, price_per_night, max_guests, bedrooms, city, amenity_mask,
+                    CASE WHEN review_count > 0 THEN CAST(rating_sum AS REAL) / review_count ELSE 0 END,
+                    review_count, CAST(strftime('%s', created_at) AS INTEGER), is_available
+             FROM properties"""
+
+def _epoch(created_at: str) -> int:
+    # Same value as strftime('%s', ...) in SQLite, which reads timestamps as UTC
+    return int(datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).timestamp())
+
+class PropertyCatalog:
+    """The browse columns of every listing held as NumPy arrays.
+    
+    Filters run as vectorized masks over the whole catalog and only the ids of
+    the requested page come back, so PropertyManager builds dicts for those
+    rows alone. Writes made through the managers are applied incrementally on
+    the next query; a full reload every CATALOG_RESYNC seconds catches the rest.
+    Free-text search stays in SQLite (FTS5): page() returns None for it.
+    """
+    
+    def __init__(self, db_manager, resync: float = CATALOG_RESYNC):
+        self.db = db_manager
+        self.resync = resync
+        self._lock = threading.Lock()
+        self._size = 0
+        self._columns = None
+        self._row_of = {}           # property id -> row in the columns
+        self._city_codes = {}       # lower-cased city -> code
+        self._order = None          # rows by (created_at, id), ascending
+        self._sorted_keys = None
+        self._max_id = 0
+        self._dirty = set()
+        self._reload_at = 0.0
+        self.db.add_change_listener(self._on_change)
+    
+    def _on_change(self, table: str, property_id: int = None):
+        if table not in ('properties', 'reviews'):
+            return
+        with self._lock:
+            if property_id is None:
+                self._reload_at = 0.0
+            elif property_id <= self._max_id:
+                self._dirty.add(property_id)
+    
+    def __len__(self):
+        return self._size
+    
+    def stats(self) -> dict:
+        columns = self._columns or {}
+        return {'listings': self._size, 'cities': len(self._city_codes),
+                'bytes': sum(column.nbytes for column in columns.values())}
+    
+    def _city_code(self, city: str) -> int:
+        return self._city_codes.setdefault((city or '').lower(), len(self._city_codes))
+    
+    def _to_columns(self, rows: list) -> dict:
+        ids, price, guests, bedrooms, city, mask, rating, reviews, created, available = zip(*rows)
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'price': np.array(price, dtype=np.float64),
+            'max_guests': np.array(guests, dtype=np.int32),
+            'bedrooms': np.array(bedrooms, dtype=np.int32),
+            'city': np.array([self._city_code(name) for name in city], dtype=np.int32),
+            'amenity_mask': np.array(mask, dtype=np.int64),
+            'rating': np.array(rating, dtype=np.float32),
+            'review_count': np.array(reviews, dtype=np.int32),
+            'sort_key': (np.array([value or 0 for value in created], dtype=np.int64) << ID_BITS)
+                        | np.array(ids, dtype=np.int64),
+            'available': np.array(available, dtype=bool),
+        }
+    
+    def _reload(self, conn):
+        rows = conn.execute(COLUMNS + " ORDER BY id").fetchall()
+        self._city_codes = {}
+        self._dirty.clear()
+        if not rows:
+            self._columns, self._size, self._row_of, self._max_id = None, 0, {}, 0
+            self._order = self._sorted_keys = None
+        else:
+            self._columns = self._to_columns(rows)
+            self._size = len(rows)
+            self._row_of = {property_id: row for row, property_id in enumerate(self._columns['id'].tolist())}
+            self._max_id = rows[-1][0]
+            self._order = np.argsort(self._columns['sort_key'], kind='stable')
+            self._sorted_keys = self._columns['sort_key'][self._order]
+        self._reload_at = time.monotonic() + self.resync
+    
+    def _append(self, rows: list):
+        new = self._to_columns(rows)
+        if self._columns is None:
+            self._columns, self._size = new, 0
+            self._order = np.empty(0, dtype=np.int64)
+            self._sorted_keys = np.empty(0, dtype=np.int64)
+        else:
+            self._columns = {name: np.concatenate([column, new[name]]) for name, column in self._columns.items()}
+        start = self._size
+        for offset, row in enumerate(rows):
+            self._row_of[row[0]] = start + offset
+        self._size += len(rows)
+        self._max_id = rows[-1][0]
+        keys = new['sort_key']
+        if len(self._sorted_keys) and keys.min() < self._sorted_keys[-1]:
+            # Back-dated rows (imports with explicit created_at): sort again
+            self._order = np.argsort(self._columns['sort_key'], kind='stable')
+        else:
+            # New listings are the newest, so the order only grows at its end
+            self._order = np.concatenate([self._order, start + np.argsort(keys, kind='stable')])
+        self._sorted_keys = self._columns['sort_key'][self._order]
+    
+    def _update(self, rows: list):
+        changed = self._to_columns(rows)
+        positions = np.array([self._row_of[row[0]] for row in rows])
+        # Copy on write: a page() still filtering the old arrays never sees a half-applied
+        # edit. Only columns that actually changed are copied; created_at never does,
+        # so the sort order holds.
+        columns = dict(self._columns)
+        for name, column in columns.items():
+            if not np.array_equal(column[positions], changed[name]):
+                column = column.copy()
+                column[positions] = changed[name]
+                columns[name] = column
+        self._columns = columns
+    
+    def refresh(self):
+        """Apply pending changes: a full reload when due, otherwise new and edited rows only."""
+        with self._lock:
+            with self.db.connection() as conn:
+                if time.monotonic() >= self._reload_at:
+                    self._reload(conn)
+                    return
+                new_rows = conn.execute(COLUMNS + " WHERE id > ? ORDER BY id", (self._max_id,)).fetchall()
+                dirty = sorted(self._dirty & self._row_of.keys())
+                self._dirty.clear()
+                changed = conn.execute(COLUMNS + " WHERE id IN (SELECT value FROM json_each(?))",
+                                       (json.dumps(dirty),)).fetchall() if dirty else []
+            if new_rows:
+                self._append(new_rows)
+            if changed:
+                self._update(changed)
+    
+    def page(self, city: str = None, max_price: float = None, min_guests: int = None,
+             search: str = None, amenities: List[str] = None, check_in=None, check_out=None,
+             limit: int = 12, cursor: str = None, min_rating: float = None) -> Optional[Tuple[List[int], bool]]:
+        """Ids of one browse page, newest first, and whether more pages follow.
+        
+        Takes the same filters and cursor as PropertyManager.get_properties_page.
+        Returns None for filters the catalog cannot answer exactly (free text,
+        LIKE wildcards or non-ASCII in the city prefix), which stay in SQLite.
+        """
+        if search:
+            return None
+        prefix = (city or '').lower()
+        if prefix and ('%' in prefix or '_' in prefix or not prefix.isascii()):
+            return None
+        if amenities:
+            unknown = [amenity for amenity in amenities if amenity not in AMENITY_BITS]
+            if unknown:
+                raise ValueError(f"Unknown amenities: {unknown}")
+        
+        self.refresh()
+        with self._lock:
+            columns, size, order, sorted_keys = self._columns, self._size, self._order, self._sorted_keys
+            city_codes = [code for name, code in self._city_codes.items() if name.startswith(prefix)] if prefix else None
+        if not size:
+            return [], False
+        
+        mask = columns['available'].copy()
+        if city_codes is not None:
+            mask &= np.isin(columns['city'], city_codes)
+        if max_price:
+            mask &= columns['price'] <= max_price
+        if min_guests:
+            mask &= columns['max_guests'] >= min_guests
+        if amenities:
+            required = amenity_mask(amenities)
+            mask &= (columns['amenity_mask'] & required) == required
+        if min_rating:
+            mask &= columns['rating'] >= min_rating
+        
+        end = size
+        if cursor:
+            created_at, after_id = json.loads(cursor)
+            key = min((_epoch(created_at) << ID_BITS) | after_id, np.iinfo(np.int64).max)
+            end = int(np.searchsorted(sorted_keys, key))
+        # Matching rows in browse order (newest first) from the cursor on
+        hits = order[:end][mask[order[:end]]][::-1]
+        ids = columns['id'][hits]
+        
+        if check_in and check_out:
+            ids = self._available(ids, check_in, check_out, limit + 1)
+        page = ids[:limit + 1].tolist()
+        return page[:limit], len(page) > limit
+    
+    def _available(self, ids: np.ndarray, check_in, check_out, wanted: int) -> np.ndarray:
+        # booking_nights is keyed by (property_id, night): probe candidates in
+        # browse order, a batch at a time, until the page is full
+        free = []
+        with self.db.connection() as conn:
+            for start in range(0, len(ids), AVAILABILITY_BATCH):
+                batch = ids[start:start + AVAILABILITY_BATCH].tolist()
+                booked = {row[0] for row in conn.execute("""
+                    SELECT DISTINCT property_id FROM booking_nights
+                    WHERE property_id IN (SELECT value FROM json_each(?)) AND night >= ? AND night < ?
+                """, (json.dumps(batch), str(check_in), str(check_out)))}
+                free += [property_id for property_id in batch if property_id not in booked]
+                if len(free) >= wanted:
+                    break
+        return np.array(free, dtype=np.int64)
@@ -0,0 +1,177 @@
+# Oikos Command Line
+# Usage: python oikos_cli.py [--db oikos.db] <command>
+import argparse
+import sys
+from oikos_database import DatabaseManager
+
+def cmd_migrate(db, args):
+    from oikos_migrations import current_version, migrate
+    with db.connection() as conn:
+        applied = migrate(conn)
+        version = current_version(conn)
+    print(f"Applied migrations: {applied or 'none'}; schema version is now {version}")
+
+def cmd_check_plans(db, args):
+    from oikos_migrations import audit_query_plans
+    try:
+        results = audit_query_plans(db)
+    except AssertionError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for result in results:
+        print(f"ok  {result['call']}: {' | '.join(result['plan'])}")
+
+def cmd_rebuild_ratings(db, args):
+    from oikos_migrations import rebuild_rating_aggregates
+    with db.connection() as conn:
+        rebuild_rating_aggregates(conn)
+        conn.commit()
+    db.notify_change('reviews')
+    print("Rebuilt rating aggregates for all properties")
+
+def cmd_rebuild_search(db, args):
+    from oikos_migrations import rebuild_search_index
+    with db.connection() as conn:
+        rebuild_search_index(conn)
+        conn.commit()
+    print("Rebuilt the property full-text search index")
+
+def cmd_rebuild_calendar(db, args):
+    from oikos_migrations import rebuild_booking_calendar
+    with db.connection() as conn:
+        rebuild_booking_calendar(conn)
+        conn.commit()
+    db.notify_change('bookings')
+    print("Rebuilt the nightly booking calendar")
+
+def cmd_purge_sessions(db, args):
+    from oikos_sessions import SessionManager
+    purged = SessionManager(db).purge_expired()
+    print(f"Deleted {purged} expired sessions")
+
+def cmd_seed(db, args):
+    from oikos_auth import UserManager
+    from oikos_properties import PropertyManager
+    from oikos_utils import populate_sample_data
+    users = UserManager(db)
+    try:
+        if populate_sample_data(users, PropertyManager(db)):
+            print("Loaded the sample users and listings")
+        else:
+            print("Database already has listings; nothing to seed")
+    finally:
+        users.close()
+
+def cmd_import(db, args):
+    from oikos_import import import_properties, read_records
+    report = import_properties(db, read_records(args.path, args.format), chunk_size=args.chunk_size)
+    for error in report['errors']:
+        print(error, file=sys.stderr)
+    print(f"Imported {report['imported']} of {report['rows']} rows ({report['rejected']} rejected) "
+          f"in {report['seconds']}s, {report['rows_per_sec']} rows/sec")
+    return 1 if report['rejected'] else 0
+
+def cmd_synth(db, args):
+    from oikos_synth import synthesize
+    counts = synthesize(db, args.listings, users=args.users, bookings_per_listing=args.bookings_per_listing,
+                        seed=args.seed)
+    print("Generated " + ", ".join(f"{count} {kind}" for kind, count in counts.items()))
+
+def cmd_query_stats(db, args):
+    import json
+    from oikos_migrations import manager_read_paths
+    from oikos_querystats import QueryStats
+    import logging
+    logging.getLogger("oikos.slow_queries").addHandler(logging.NullHandler())  # reported below instead
+    db.query_stats = QueryStats(slow_ms=args.slow_ms)
+    db.close()  # reopen pooled connections with instrumentation
+    calls = manager_read_paths(db)
+    for _ in range(args.iterations):
+        for call in calls.values():
+            call()
+    summary = db.query_stats.summary(top=args.top)
+    slow_queries = db.query_stats.slow_queries()
+    if args.json:
+        print(json.dumps({'summary': summary, 'slow_queries': slow_queries}, indent=2))
+        return
+    for entry in summary:
+        site = next(iter(entry['call_sites']), '?')
+        print(f"{entry['total_ms']:>10.1f} ms  {entry['calls']:>5} calls  p95<={entry['p95_ms']} ms  "
+              f"{entry['rows']:>8} rows  {site}\n    {entry['sql'][:160]}")
+    for slow in slow_queries:
+        print(f"SLOW {slow['ms']} ms at {slow['site']}: {' | '.join(slow['plan'])}")
+
+def cmd_index_photos(db, args):
+    from oikos_images import ImageCache
+    from oikos_photo_search import ListingPhotoSearch
+    report = ListingPhotoSearch(db, index_kind=args.index, image_cache=ImageCache()).refresh(force=True)
+    print(f"{report['images']} listing photos: {report['embedded']} embedded ({report['images_per_sec']}/s), "
+          f"{report['reused'] + report['cached']} reused, {report['failed']} failed")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Oikos maintenance commands")
+    parser.add_argument("--db", default="oikos.db", help="path to the SQLite database")
+    parser.add_argument("--profile", default="default", help="storage profile (see STORAGE_PROFILES)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="apply pending schema migrations")
+    migrate.set_defaults(handler=cmd_migrate)
+    
+    seed = subparsers.add_parser("seed", help="load the demo users and listings into an empty database")
+    seed.set_defaults(handler=cmd_seed)
+    
+    import_listings = subparsers.add_parser("import", help="bulk-load listings from a CSV or JSONL file")
+    import_listings.add_argument("path")
+    import_listings.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    import_listings.add_argument("--chunk-size", type=int, default=10000, help="rows per transaction")
+    import_listings.set_defaults(handler=cmd_import)
+    
+    synth = subparsers.add_parser("synth", help="generate a reproducible synthetic catalog for load testing")
+    synth.add_argument("--listings", type=int, default=10000)
+    synth.add_argument("--users", type=int, help="default: one per two listings")
+    synth.add_argument("--bookings-per-listing", type=float, default=6.0)
+    synth.add_argument("--seed", type=int, default=42)
+    synth.set_defaults(handler=cmd_synth)
+    
+    check_plans = subparsers.add_parser("check-plans", help="EXPLAIN every manager query and verify index use")
+    check_plans.set_defaults(handler=cmd_check_plans)
+    
+    rebuild_ratings = subparsers.add_parser("rebuild-ratings",
+                                            help="recompute avg rating / review count columns from reviews")
+    rebuild_ratings.set_defaults(handler=cmd_rebuild_ratings)
+    
+    rebuild_search = subparsers.add_parser("rebuild-search", help="rebuild the property full-text index")
+    rebuild_search.set_defaults(handler=cmd_rebuild_search)
+    
+    rebuild_calendar = subparsers.add_parser("rebuild-calendar",
+                                             help="regenerate booking_nights from confirmed bookings")
+    rebuild_calendar.set_defaults(handler=cmd_rebuild_calendar)
+    
+    purge_sessions = subparsers.add_parser("purge-sessions", help="delete expired login sessions")
+    purge_sessions.set_defaults(handler=cmd_purge_sessions)
+    
+    index_photos = subparsers.add_parser("index-photos",
+                                         help="download and embed listing photos for photo search")
+    index_photos.add_argument("--index", default="flat", help="faiss index type (see simple_image_search.INDEX_KINDS)")
+    index_photos.set_defaults(handler=cmd_index_photos)
+    
+    query_stats = subparsers.add_parser("query-stats",
+                                        help="run every manager read path and report SQLite time per statement")
+    query_stats.add_argument("--iterations", type=int, default=10)
+    query_stats.add_argument("--top", type=int, default=15)
+    query_stats.add_argument("--slow-ms", type=float, default=50.0, help="EXPLAIN and log statements slower than this")
+    query_stats.add_argument("--json", action="store_true")
+    query_stats.set_defaults(handler=cmd_query_stats)
+    
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = DatabaseManager(args.db, profile=args.profile)
+    try:
+        return args.handler(db, args) or 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
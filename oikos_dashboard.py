@@ -3,17 +3,20 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import date
+from oikos_profiling import phase
 
-def show_dashboard(property_manager, booking_manager):
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem 0;">
-        <h1 style="font-size: 2.5rem; font-weight: 700; color: #1a1a1a; margin-bottom: 0.5rem;">📊 Travel Dashboard</h1>
-        <p style="font-size: 1.1rem; color: #666; margin-bottom: 2rem;">Your travel insights and booking analytics</p>
-    </div>
-    """, unsafe_allow_html=True)
+def show_dashboard(property_manager, booking_manager, user):
+    with phase('widgets'):
+        st.markdown("""
+        <div style="text-align: center; padding: 2rem 0;">
+            <h1 style="font-size: 2.5rem; font-weight: 700; color: #1a1a1a; margin-bottom: 0.5rem;">📊 Travel Dashboard</h1>
+            <p style="font-size: 1.1rem; color: #666; margin-bottom: 2rem;">Your travel insights and booking analytics</p>
+        </div>
+        """, unsafe_allow_html=True)
     
     # Get user's bookings for analytics
-    bookings = booking_manager.get_user_bookings(st.session_state.user['id'])
+    with phase('data'):
+        bookings = booking_manager.get_user_bookings(user['id'])
     
     if not bookings:
         st.markdown("""
@@ -25,11 +28,10 @@ def show_dashboard(property_manager, booking_manager):
         return
     
     # Professional metrics cards
-    col1, col2, col3, col4 = st.columns(4)
-    
-    total_spent = sum(booking['total_price'] for booking in bookings)
-    completed_bookings = [b for b in bookings if b['check_out_date'] < date.today()]
-    upcoming_bookings = [b for b in bookings if b['check_in_date'] > date.today()]
+    with phase('data'):
+        total_spent = sum(booking['total_price'] for booking in bookings)
+        completed_bookings = [b for b in bookings if b['check_out_date'] < date.today()]
+        upcoming_bookings = [b for b in bookings if b['check_in_date'] > date.today()]
     
     metrics = [
         ("📋", "Total Bookings", len(bookings), "#667eea"),
@@ -38,43 +40,124 @@ def show_dashboard(property_manager, booking_manager):
         ("🔮", "Upcoming", len(upcoming_bookings), "#FF9800")
     ]
     
-    for i, (icon, label, value, color) in enumerate(metrics):
-        with [col1, col2, col3, col4][i]:
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, {color}, {color}dd); color: white; padding: 2rem 1rem; border-radius: 20px; text-align: center; box-shadow: 0 8px 30px rgba(0,0,0,0.12); margin-bottom: 1rem;">
-                <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icon}</div>
-                <div style="font-size: 2rem; font-weight: 700; margin-bottom: 0.5rem;">{value}</div>
-                <div style="font-size: 0.9rem; opacity: 0.9; font-weight: 500;">{label}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    with phase('html'):
+        cards = [f"""
+        <div style="background: linear-gradient(135deg, {color}, {color}dd); color: white; padding: 2rem 1rem; border-radius: 20px; text-align: center; box-shadow: 0 8px 30px rgba(0,0,0,0.12); margin-bottom: 1rem;">
+            <div style="font-size: 2rem; margin-bottom: 0.5rem;">{icon}</div>
+            <div style="font-size: 2rem; font-weight: 700; margin-bottom: 0.5rem;">{value}</div>
+            <div style="font-size: 0.9rem; opacity: 0.9; font-weight: 500;">{label}</div>
+        </div>
+        """ for icon, label, value, color in metrics]
+    
+    with phase('widgets'):
+        for col, card in zip(st.columns(4), cards):
+            with col:
+                st.markdown(card, unsafe_allow_html=True)
     
     # Booking timeline chart
     if bookings:
         st.markdown("### Booking Timeline")
         
-        # Prepare data for chart
-        booking_dates = []
-        booking_amounts = []
-        
-        for booking in bookings:
-            booking_dates.append(booking['check_in_date'])
-            booking_amounts.append(booking['total_price'])
-        
-        # Create DataFrame for plotting
-        df = pd.DataFrame({
-            'Date': booking_dates,
-            'Amount': booking_amounts
-        })
+        with phase('charts'):
+            # Prepare data for chart
+            booking_dates = []
+            booking_amounts = []
+            
+            for booking in bookings:
+                booking_dates.append(booking['check_in_date'])
+                booking_amounts.append(booking['total_price'])
+            
+            # Create DataFrame for plotting
+            df = pd.DataFrame({
+                'Date': booking_dates,
+                'Amount': booking_amounts
+            })
+            
+            # Create line chart
+            fig = px.line(df, x='Date', y='Amount', 
+                         title='Booking Spending Over Time',
+                         markers=True)
+            
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Amount ($)",
+                showlegend=False
+            )
         
-        # Create line chart
-        fig = px.line(df, x='Date', y='Amount', 
-                     title='Booking Spending Over Time',
-                     markers=True)
-        
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Amount ($)",
-            showlegend=False
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        with phase('widgets'):
+            st.plotly_chart(fig, use_container_width=True)
+
+def show_admin_page(db_manager, profiler=None, caches=None):
+    st.markdown("""
+    <div style="text-align: center; padding: 2rem 0;">
+        <h1 style="font-size: 2.5rem; font-weight: 700; color: #1a1a1a; margin-bottom: 0.5rem;">🛠️ Admin</h1>
+        <p style="font-size: 1.1rem; color: #666; margin-bottom: 2rem;">Where this process spends its time</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    stats = db_manager.query_stats
+    if stats is None:
+        st.info("Query instrumentation is off for this process.")
+    else:
+        show_query_stats(db_manager, stats)
+    
+    if caches:
+        st.markdown("### Caches")
+        st.dataframe(pd.DataFrame([dict(cache=name, **stats) for name, stats in caches.items()]),
+                     use_container_width=True, hide_index=True)
+    
+    st.markdown("### Page reruns")
+    if profiler is None:
+        st.info("Rerun profiling is off; start the app with OIKOS_PROFILE=1 to enable it.")
+    else:
+        show_rerun_profile(profiler)
+
+def show_query_stats(db_manager, stats):
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        top = st.slider("Statements", 5, 50, 15)
+    with col2:
+        if st.button("Reset counters", use_container_width=True):
+            stats.reset()
+    
+    summary = stats.summary(top=top)
+    if summary:
+        st.markdown("### Top statements by total time")
+        st.dataframe(pd.DataFrame([{
+            'total ms': entry['total_ms'], 'calls': entry['calls'], 'mean ms': entry['mean_ms'],
+            'p95 ms ≤': entry['p95_ms'], 'max ms': entry['max_ms'], 'rows': entry['rows'],
+            'call site': next(iter(entry['call_sites']), ''), 'sql': entry['sql'],
+        } for entry in summary]), use_container_width=True, hide_index=True)
+    
+    st.markdown(f"### Slow queries (over {stats.slow_ms:g} ms)")
+    slow_queries = stats.slow_queries()
+    if slow_queries:
+        st.dataframe(pd.DataFrame([dict(entry, plan=" | ".join(entry['plan']))
+                                   for entry in reversed(slow_queries)]),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.markdown("None yet.")
+    
+    st.markdown("### Connection pool")
+    st.json(db_manager.pool_stats())
+
+def show_rerun_profile(profiler):
+    rows = profiler.summary()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown(f"{profiler.reruns} profiled reruns. Phase times exclude nested phases; "
+                    "'other' is time spent outside any phase.")
+    with col2:
+        if st.button("Reset profile", use_container_width=True):
+            profiler.reset()
+            rows = []
+    
+    if rows:
+        st.dataframe(pd.DataFrame([{
+            'page': row['page'], 'phase': row['phase'], 'calls': row['calls'],
+            'total ms': row['total_ms'], 'mean ms': row['mean_ms'], 'p50 ms': row['p50_ms'],
+            'p95 ms': row['p95_ms'], 'max ms': row['max_ms'], 'share': row['share'],
+        } for row in rows]), use_container_width=True, hide_index=True)
+    
+    st.download_button("Export JSON", profiler.export_json(), file_name="oikos-rerun-profile.json",
+                       mime="application/json")
@@ -1,89 +1,269 @@
 # Oikos Database Management
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 import streamlit as st
+from oikos_migrations import migrate, schema_is_current
+from oikos_querystats import InstrumentedConnection
+
+# PRAGMAs applied to every pooled connection. "production" trades a little
+# durability on power loss (synchronous=NORMAL) for WAL, which lets browse
+# readers keep going while a booking is being written.
+STORAGE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,      # KiB, i.e. 64 MiB of page cache
+        'mmap_size': 268435456,    # 256 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,      # ms
+    },
+}
+
+class PoolTimeout(Exception):
+    pass
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all managers.
+    
+    A thread that already holds a connection gets the same one back on a
+    nested checkout, so manager methods can call each other freely.
+    """
+    
+    def __init__(self, connect, size: int = 5, timeout: float = 10.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0,
+                       'peak_in_use': 0, 'created': 0, 'discarded': 0}
+    
+    def _acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                      f"(pool size {self.size})")
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            
+            self._stats['checkouts'] += 1
+            self._in_use += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+            self._stats['created'] += 1
+        
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+    
+    def _release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+            conn.close()
+        
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(conn)
+            else:
+                self._created -= 1
+                self._stats['discarded'] += 1
+            self._cond.notify()
+    
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(self._stats, size=self.size, in_use=self._in_use,
+                        idle=len(self._idle), open=self._created)
+    
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            conn.close()
 
 class DatabaseManager:
-    def __init__(self, db_path="oikos.db"):
+    def __init__(self, db_path="oikos.db", pool_size: int = 5, pool_timeout: float = 10.0,
+                 profile: str = "default", query_stats=None):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile {profile!r}; "
+                             f"expected one of {sorted(STORAGE_PROFILES)}")
         self.db_path = db_path
+        self.profile = profile
+        # Optional oikos_querystats.QueryStats that every pooled connection reports to
+        self.query_stats = query_stats
+        self.pool = ConnectionPool(self.get_connection, size=pool_size, timeout=pool_timeout)
+        self._listeners = []
         self.init_database()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        if self.query_stats is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=InstrumentedConnection)
+            conn.query_stats = self.query_stats
+        for pragma, value in STORAGE_PROFILES[self.profile].items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
     
-    def init_database(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                phone TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_host BOOLEAN DEFAULT FALSE
-            )
-        """)
-        
-        # Properties table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS properties (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                host_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                property_type TEXT NOT NULL,
-                city TEXT NOT NULL,
-                country TEXT NOT NULL,
-                address TEXT NOT NULL,
-                price_per_night REAL NOT NULL,
-                max_guests INTEGER NOT NULL,
-                bedrooms INTEGER NOT NULL,
-                bathrooms INTEGER NOT NULL,
-                amenities TEXT,
-                image_url TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_available BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (host_id) REFERENCES users (id)
-            )
-        """)
+    def connection(self):
+        """Check a pooled connection out for the duration of a ``with`` block.
         
-        # Bookings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                property_id INTEGER NOT NULL,
-                guest_id INTEGER NOT NULL,
-                check_in_date DATE NOT NULL,
-                check_out_date DATE NOT NULL,
-                total_price REAL NOT NULL,
-                guest_count INTEGER NOT NULL,
-                status TEXT DEFAULT 'confirmed',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (property_id) REFERENCES properties (id),
-                FOREIGN KEY (guest_id) REFERENCES users (id)
-            )
-        """)
+        Uncommitted work is rolled back when the block exits.
+        """
+        return self.pool.connection()
+    
+    def pool_stats(self) -> dict:
+        return self.pool.stats()
+    
+    def close(self):
+        self.pool.close()
+    
+    def add_change_listener(self, listener):
+        """Call ``listener(table, property_id)`` after a manager commits a change.
         
-        # Reviews table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                property_id INTEGER NOT NULL,
-                guest_id INTEGER NOT NULL,
-                booking_id INTEGER NOT NULL,
-                rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
-                comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (property_id) REFERENCES properties (id),
-                FOREIGN KEY (guest_id) REFERENCES users (id),
-                FOREIGN KEY (booking_id) REFERENCES bookings (id)
-            )
-        """)
+        Bound methods are held weakly so short-lived managers can be collected.
+        """
+        if hasattr(listener, '__self__'):
+            self._listeners.append(weakref.WeakMethod(listener))
+        else:
+            self._listeners.append(lambda: listener)
+    
+    def notify_change(self, table: str, property_id: int = None):
+        dead = []
+        for ref in list(self._listeners):
+            listener = ref()
+            if listener is None:
+                dead.append(ref)
+            else:
+                listener(table, property_id)
+        if dead:
+            self._listeners = [ref for ref in self._listeners if ref not in dead]
+    
+    def init_database(self, force: bool = False):
+        """Create the base tables and apply migrations.
         
-        conn.commit()
-        conn.close()
+        A database already at the latest schema version is left alone, so
+        opening it runs no DDL unless ``force`` is set.
+        """
+        with self.connection() as conn:
+            if not force and schema_is_current(conn):
+                return
+            
+            cursor = conn.cursor()
+            
+            # Users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    first_name TEXT NOT NULL,
+                    last_name TEXT NOT NULL,
+                    phone TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_host BOOLEAN DEFAULT FALSE
+                )
+            """)
+            
+            # Properties table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS properties (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    host_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    property_type TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    country TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    price_per_night REAL NOT NULL,
+                    max_guests INTEGER NOT NULL,
+                    bedrooms INTEGER NOT NULL,
+                    bathrooms INTEGER NOT NULL,
+                    amenities TEXT,
+                    image_url TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_available BOOLEAN DEFAULT TRUE,
+                    FOREIGN KEY (host_id) REFERENCES users (id)
+                )
+            """)
+            
+            # Bookings table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bookings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    property_id INTEGER NOT NULL,
+                    guest_id INTEGER NOT NULL,
+                    check_in_date DATE NOT NULL,
+                    check_out_date DATE NOT NULL,
+                    total_price REAL NOT NULL,
+                    guest_count INTEGER NOT NULL,
+                    status TEXT DEFAULT 'confirmed',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (property_id) REFERENCES properties (id),
+                    FOREIGN KEY (guest_id) REFERENCES users (id)
+                )
+            """)
+            
+            # Reviews table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    property_id INTEGER NOT NULL,
+                    guest_id INTEGER NOT NULL,
+                    booking_id INTEGER NOT NULL,
+                    rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
+                    comment TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (property_id) REFERENCES properties (id),
+                    FOREIGN KEY (guest_id) REFERENCES users (id),
+                    FOREIGN KEY (booking_id) REFERENCES bookings (id)
+                )
+            """)
+            
+            conn.commit()
+            
+            # Indexes and later schema changes are versioned in oikos_migrations
+            migrate(conn)
@@ -0,0 +1,297 @@
+# Oikos Image Cache
+# Listing photos are fetched once, in the background, and served from static/thumbs.
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+import numpy as np
+import requests
+from PIL import Image
+from oikos_utils import STATIC_DIR
+
+THUMBS_DIR = os.path.join(STATIC_DIR, "thumbs")      # served by Streamlit at app/static/thumbs/
+DATA_DIR = "./image_cache"                           # URL records and embeddings
+THUMBNAIL_SIZE = (480, 480)                          # bounding box; aspect ratio is kept
+THUMBNAIL_BYTES = 256 * 2 ** 20
+EMBEDDING_BYTES = 64 * 2 ** 20
+FETCH_TIMEOUT = (3.05, 10)                           # connect, read (seconds)
+MAX_IMAGE_BYTES = 20 * 2 ** 20
+MAX_REDIRECTS = 5
+FETCH_WORKERS = 4
+RETRY_FAILED = 3600                                  # seconds before a failed URL is tried again
+TOUCH_INTERVAL = 3600                                # seconds between mtime updates of a used file
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode()).hexdigest()
+
+def check_public_url(url: str):
+    """Raise ValueError unless ``url`` is http(s) and its host resolves only to public addresses.
+    
+    image_url is host input, so this keeps the fetcher off local files,
+    loopback, private networks and link-local (cloud metadata) addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError("not an http(s) URL")
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot resolve {parts.hostname}: {e}") from None
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"{parts.hostname} resolves to non-public address {address}")
+
+class DiskLRU:
+    """Files in one directory, evicted least recently used first above ``max_bytes``.
+    
+    Recency is tracked in memory and persisted through file mtimes (updated
+    at most every TOUCH_INTERVAL), so the order survives restarts.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int, suffix: str):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._files = OrderedDict()   # name -> [size, mtime]
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(suffix) and entry.is_file():
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(suffix)], stat.st_size))
+        for mtime, name, size in sorted(found):
+            self._files[name] = [size, mtime]
+            self._bytes += size
+    
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name + self.suffix)
+    
+    def get(self, name: str) -> Optional[str]:
+        """Path of ``name`` if cached, marking it recently used."""
+        with self._lock:
+            entry = self._files.get(name)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._files.move_to_end(name)
+            self._stats['hits'] += 1
+            now = time.time()
+            touch = now - entry[1] > TOUCH_INTERVAL
+            if touch:
+                entry[1] = now
+        if touch:
+            try:
+                os.utime(self.path(name))
+            except OSError:
+                pass
+        return self.path(name)
+    
+    def put(self, name: str, data: bytes) -> str:
+        path = self.path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        evicted = []
+        with self._lock:
+            old = self._files.pop(name, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._files[name] = [len(data), time.time()]
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                victim, (size, _) = self._files.popitem(last=False)
+                self._bytes -= size
+                self._stats['evictions'] += 1
+                evicted.append(victim)
+        for victim in evicted:
+            try:
+                os.remove(self.path(victim))
+            except OSError:
+                pass
+        return path
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._files), bytes=self._bytes)
+
+class ImageCache:
+    """Thumbnails and embeddings of remote images, on disk and keyed by content.
+    
+    fetch() downloads a URL once (with a timeout and a size cap), stores a
+    JPEG thumbnail named after the SHA-256 of the downloaded bytes and
+    records URL -> digest; the same picture under several URLs is stored
+    once. card_src() never blocks: for an image not cached yet it queues a
+    background fetch and returns the original URL for this render.
+    """
+    
+    def __init__(self, thumbs_dir: str = THUMBS_DIR, data_dir: str = DATA_DIR,
+                 thumbnail_bytes: int = THUMBNAIL_BYTES, embedding_bytes: int = EMBEDDING_BYTES,
+                 workers: int = FETCH_WORKERS):
+        self.thumbs = DiskLRU(thumbs_dir, thumbnail_bytes, ".jpg")
+        self.embeddings = DiskLRU(os.path.join(data_dir, "embeddings"), embedding_bytes, ".npy")
+        self.urls_dir = os.path.join(data_dir, "urls")
+        os.makedirs(self.urls_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._urls = {}          # url -> digest, or (error, failed_at)
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oikos-images")
+        self._stats = {'fetched': 0, 'failed': 0, 'fetch_ms': 0.0}
+    
+    def _record(self, url: str):
+        with self._lock:
+            if url in self._urls:
+                return self._urls[url]
+        try:
+            with open(os.path.join(self.urls_dir, _url_key(url) + ".json")) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        record = saved['digest'] if saved.get('digest') else (saved['error'], saved['failed_at'])
+        with self._lock:
+            self._urls[url] = record
+        return record
+    
+    def _save_record(self, url: str, record):
+        saved = {'url': url, 'digest': record} if isinstance(record, str) else \
+                {'url': url, 'error': record[0], 'failed_at': record[1]}
+        path = os.path.join(self.urls_dir, _url_key(url) + ".json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._urls[url] = record
+    
+    def _download(self, url: str) -> bytes:
+        # Redirects are followed by hand so every hop is checked, not just the first
+        for _ in range(MAX_REDIRECTS + 1):
+            check_public_url(url)
+            with requests.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers['location'])
+                    continue
+                response.raise_for_status()
+                data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+            if len(data) > MAX_IMAGE_BYTES:
+                raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+            return data
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+    
+    def thumbnail_path(self, url: str) -> Optional[str]:
+        """Local thumbnail of ``url`` if it has been fetched (no network access)."""
+        record = self._record(url)
+        return self.thumbs.get(record) if isinstance(record, str) else None
+    
+    def fetch(self, url: str) -> Optional[str]:
+        """Content digest of ``url``'s image, downloading it if needed; None if it cannot be read."""
+        record = self._record(url)
+        if isinstance(record, str):
+            if self.thumbs.get(record) is not None:
+                return record
+        elif record is not None and time.time() - record[1] < RETRY_FAILED:
+            return None
+        
+        start = time.perf_counter()
+        try:
+            data = self._download(url)
+            digest = hashlib.sha256(data).hexdigest()[:32]
+            if self.thumbs.get(digest) is None:
+                with Image.open(BytesIO(data)) as img:
+                    img = img.convert("RGB")
+                    img.thumbnail(THUMBNAIL_SIZE)
+                    out = BytesIO()
+                    img.save(out, "JPEG", quality=85, optimize=True)
+                self.thumbs.put(digest, out.getvalue())
+        except Exception as e:
+            self._save_record(url, (str(e)[:200], time.time()))
+            with self._lock:
+                self._stats['failed'] += 1
+            return None
+        self._save_record(url, digest)
+        with self._lock:
+            self._stats['fetched'] += 1
+            self._stats['fetch_ms'] += (time.perf_counter() - start) * 1000
+        return digest
+    
+    def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """fetch() for many URLs, FETCH_WORKERS at a time."""
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, self._executor.map(self.fetch, urls)))
+    
+    def _fetch_later(self, url: str):
+        with self._lock:
+            if url in self._pending:
+                return
+            self._pending.add(url)
+        
+        def run():
+            try:
+                self.fetch(url)
+            finally:
+                with self._lock:
+                    self._pending.discard(url)
+        self._executor.submit(run)
+    
+    def prefetch(self, urls: Iterable[str]):
+        """Queue background fetches for URLs that are not cached yet."""
+        for url in urls:
+            if url and self.thumbnail_path(url) is None:
+                record = self._record(url)
+                if not isinstance(record, tuple) or time.time() - record[1] >= RETRY_FAILED:
+                    self._fetch_later(url)
+    
+    def card_src(self, url: str) -> str:
+        """What an <img src> should point at: the cached thumbnail, else the URL itself."""
+        path = self.thumbnail_path(url)
+        if path is None:
+            self.prefetch([url])
+            return url
+        return f"app/static/{os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')}"
+    
+    def image_src(self, url: str) -> str:
+        """What st.image should load: the cached thumbnail file, else the URL itself."""
+        path = self.thumbnail_path(url)
+        if path is None:
+            self.prefetch([url])
+            return url
+        return path
+    
+    def load_embedding(self, digest: str, model: str) -> Optional[np.ndarray]:
+        path = self.embeddings.get(f"{model}-{digest}")
+        if path is None:
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+    
+    def save_embedding(self, digest: str, model: str, vector: np.ndarray):
+        out = BytesIO()
+        np.save(out, np.asarray(vector, dtype=np.float32))
+        self.embeddings.put(f"{model}-{digest}", out.getvalue())
+    
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, pending=len(self._pending), urls=len(self._urls))
+        thumbs, embeddings = self.thumbs.stats(), self.embeddings.stats()
+        stats.update(thumbnails=thumbs['entries'], thumbnail_bytes=thumbs['bytes'], hits=thumbs['hits'],
+                     misses=thumbs['misses'], evictions=thumbs['evictions'] + embeddings['evictions'],
+                     embeddings=embeddings['entries'], embedding_bytes=embeddings['bytes'])
+        stats['fetch_ms'] = round(stats['fetch_ms'], 1)
+        return stats
@@ -0,0 +1,170 @@
+# Oikos Bulk Import
+# Usage: python oikos_cli.py import listings.csv|listings.jsonl [--chunk-size N]
+import csv
+import functools
+import json
+import math
+import os
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from oikos_properties import amenity_mask
+
+IMPORT_CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 20
+FTS_INSERT_TRIGGER = 'trg_properties_fts_insert'
+
+REQUIRED_TEXT = ('title', 'description', 'property_type', 'city', 'country', 'address')
+REQUIRED_NUMBERS = {'host_id': int, 'price_per_night': float, 'max_guests': int,
+                    'bedrooms': int, 'bathrooms': int}
+
+def _parse_number(raw, kind):
+    """A finite number; for int fields also a whole one (3 or "3.0", never 3.5)."""
+    if isinstance(raw, bool):
+        raise ValueError
+    value = float(raw)
+    if not math.isfinite(value):
+        raise ValueError
+    if kind is int:
+        if not value.is_integer():
+            raise ValueError
+        try:
+            return int(raw)      # exact for "123" and large ids, where float() rounds
+        except ValueError:
+            return int(value)    # "3.0"
+    return value
+
+def read_records(path: str, fmt: str = None) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, record) pairs from a CSV file with a header row or from JSONL."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        elif fmt in ('jsonl', 'ndjson'):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None  # rejected by validate_property
+                yield line_no, record
+        else:
+            raise ValueError(f"Unsupported import format {fmt!r}; expected csv or jsonl")
+
+def _parse_amenities(value) -> List[str]:
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        # CSV cells hold either a JSON array or a ';'-separated list
+        value = json.loads(value) if value.lstrip().startswith('[') else value.split(';')
+    if not isinstance(value, list):
+        raise ValueError("amenities must be a list")
+    return [str(amenity).strip() for amenity in value if str(amenity).strip()]
+
+@functools.lru_cache(maxsize=4096)
+def _amenity_columns(amenities: Tuple[str, ...]) -> Tuple[str, int]:
+    # Catalogs reuse a handful of amenity lists; encode each one once
+    return json.dumps(list(amenities)), amenity_mask(amenities)
+
+def validate_property(record: Dict) -> Tuple:
+    """Return the properties INSERT parameters for a record, or raise ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    values = {}
+    for field in REQUIRED_TEXT:
+        text = str(record.get(field) or '').strip()
+        if not text:
+            raise ValueError(f"{field} is required")
+        values[field] = text
+    for field, kind in REQUIRED_NUMBERS.items():
+        raw = record.get(field)
+        if raw in (None, ''):
+            raise ValueError(f"{field} is required")
+        try:
+            values[field] = _parse_number(raw, kind)
+        except (TypeError, ValueError):
+            expected = "a whole number" if kind is int else "a finite number"
+            raise ValueError(f"{field} must be {expected}, got {raw!r}") from None
+    if values['price_per_night'] < 0:
+        raise ValueError("price_per_night must not be negative")
+    if values['max_guests'] < 1:
+        raise ValueError("max_guests must be at least 1")
+    if values['bedrooms'] < 0 or values['bathrooms'] < 0:
+        raise ValueError("bedrooms and bathrooms must not be negative")
+    amenities_json, mask = _amenity_columns(tuple(_parse_amenities(record.get('amenities'))))
+    
+    return (values['host_id'], values['title'], values['description'], values['property_type'],
+            values['city'], values['country'], values['address'], values['price_per_night'],
+            values['max_guests'], values['bedrooms'], values['bathrooms'],
+            amenities_json, mask, record.get('image_url') or None)
+
+def import_properties(db_manager, records: Iterable, chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict:
+    """Validate and insert listings in chunks, one transaction per chunk.
+    
+    ``records`` yields dicts or (line number, dict) pairs as produced by
+    read_records. Invalid rows, including ones whose host does not exist,
+    are skipped and reported; the rest of the chunk is still imported.
+    """
+    numbered = ((item if isinstance(item, tuple) else (index, item))
+                for index, item in enumerate(records, 1))
+    report = {'rows': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+    
+    def reject(line_no, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append(f"row {line_no}: {message}")
+    
+    start = time.perf_counter()
+    with db_manager.connection() as conn:
+        # The trigger keeps properties_fts in step with each insert, in the same transaction
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                        (FTS_INSERT_TRIGGER,)).fetchone() is None:
+            raise RuntimeError(f"Trigger {FTS_INSERT_TRIGGER} is missing; run 'python oikos_cli.py migrate' "
+                               "before importing")
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            report['rows'] += len(chunk)
+            
+            rows = []
+            for line_no, record in chunk:
+                try:
+                    rows.append((line_no, validate_property(record)))
+                except ValueError as e:
+                    reject(line_no, e)
+            
+            # One lookup per chunk instead of a foreign-key probe per row
+            hosts = sorted({row[0] for _, row in rows})
+            known = {host for (host,) in conn.execute(
+                "SELECT id FROM users WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(hosts),))}
+            valid = []
+            for line_no, row in rows:
+                if row[0] in known:
+                    valid.append(row)
+                else:
+                    reject(line_no, f"host_id {row[0]} does not exist")
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("""
+                    INSERT INTO properties (host_id, title, description, property_type,
+                                          city, country, address, price_per_night, max_guests,
+                                          bedrooms, bathrooms, amenities, amenity_mask, image_url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, valid)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            report['imported'] += len(valid)
+    
+    elapsed = time.perf_counter() - start
+    report['seconds'] = round(elapsed, 3)
+    report['rows_per_sec'] = round(report['rows'] / elapsed) if elapsed else 0
+    if report['imported']:
+        db_manager.notify_change('properties')
+    return report
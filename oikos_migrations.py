@@ -0,0 +1,296 @@
+# Oikos Schema Migrations
+import sqlite3
+from typing import Callable, Dict, List
+
+def rebuild_rating_aggregates(conn: sqlite3.Connection):
+    """Recompute properties.rating_sum/review_count from the reviews table."""
+    conn.execute("""
+        UPDATE properties SET
+            rating_sum = COALESCE((SELECT SUM(r.rating) FROM reviews r WHERE r.property_id = properties.id), 0),
+            review_count = (SELECT COUNT(*) FROM reviews r WHERE r.property_id = properties.id)
+    """)
+
+def rebuild_search_index(conn: sqlite3.Connection):
+    """Repopulate the properties_fts full-text index from the properties table."""
+    conn.execute("INSERT INTO properties_fts (properties_fts) VALUES ('rebuild')")
+
+def backfill_amenity_masks(conn: sqlite3.Connection):
+    """Derive properties.amenity_mask from the amenities JSON of every listing."""
+    import json
+    from oikos_properties import amenity_mask
+    rows = conn.execute("SELECT id, amenities FROM properties").fetchall()
+    conn.executemany("UPDATE properties SET amenity_mask = ? WHERE id = ?",
+                     [(amenity_mask(json.loads(amenities) if amenities else []), property_id)
+                      for property_id, amenities in rows])
+
+def rebuild_booking_calendar(conn: sqlite3.Connection):
+    """Regenerate booking_nights (one row per booked night) from confirmed bookings."""
+    conn.execute("DELETE FROM booking_nights")
+    conn.execute("""
+        WITH RECURSIVE nights (booking_id, property_id, night, check_out) AS (
+            SELECT id, property_id, date(check_in_date), date(check_out_date)
+            FROM bookings
+            WHERE status = 'confirmed' AND date(check_in_date) < date(check_out_date)
+            UNION ALL
+            SELECT booking_id, property_id, date(night, '+1 day'), check_out
+            FROM nights
+            WHERE date(night, '+1 day') < check_out
+        )
+        INSERT OR IGNORE INTO booking_nights (property_id, night, booking_id)
+        SELECT property_id, night, booking_id FROM nights
+    """)
+
+# Ordered and append-only: never edit a migration that has shipped, add a new
+# one. Each step is a SQL string or a callable taking the connection, and a
+# migration's steps commit together with its schema_version row.
+MIGRATIONS = [
+    (1, "secondary indexes for browse, availability and booking history", [
+        """CREATE INDEX IF NOT EXISTS idx_bookings_property_status_dates
+           ON bookings (property_id, status, check_in_date, check_out_date)""",
+        """CREATE INDEX IF NOT EXISTS idx_bookings_guest_created
+           ON bookings (guest_id, created_at)""",
+        """CREATE INDEX IF NOT EXISTS idx_reviews_property
+           ON reviews (property_id, created_at)""",
+        # NOCASE so the browse city prefix match (LIKE 'x%') can seek the index
+        """CREATE INDEX IF NOT EXISTS idx_properties_available_city
+           ON properties (is_available, city COLLATE NOCASE)""",
+        """CREATE INDEX IF NOT EXISTS idx_properties_available_created
+           ON properties (is_available, created_at)""",
+    ]),
+    (2, "materialized rating aggregates on properties", [
+        "ALTER TABLE properties ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE properties ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0",
+        """CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_insert AFTER INSERT ON reviews
+           BEGIN
+               UPDATE properties SET rating_sum = rating_sum + NEW.rating,
+                                     review_count = review_count + 1
+               WHERE id = NEW.property_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_delete AFTER DELETE ON reviews
+           BEGIN
+               UPDATE properties SET rating_sum = rating_sum - OLD.rating,
+                                     review_count = review_count - 1
+               WHERE id = OLD.property_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_update
+           AFTER UPDATE OF rating, property_id ON reviews
+           BEGIN
+               UPDATE properties SET rating_sum = rating_sum - OLD.rating,
+                                     review_count = review_count - 1
+               WHERE id = OLD.property_id;
+               UPDATE properties SET rating_sum = rating_sum + NEW.rating,
+                                     review_count = review_count + 1
+               WHERE id = NEW.property_id;
+           END""",
+        rebuild_rating_aggregates,
+    ]),
+    (3, "full-text search index over property text", [
+        # External-content table: the text lives in properties, FTS5 keeps only the index
+        """CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+               title, description, address, property_type, city, country,
+               content='properties', content_rowid='id',
+               tokenize='porter unicode61 remove_diacritics 2'
+           )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_properties_fts_insert AFTER INSERT ON properties
+           BEGIN
+               INSERT INTO properties_fts (rowid, title, description, address, property_type, city, country)
+               VALUES (NEW.id, NEW.title, NEW.description, NEW.address, NEW.property_type, NEW.city, NEW.country);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_properties_fts_delete AFTER DELETE ON properties
+           BEGIN
+               INSERT INTO properties_fts (properties_fts, rowid, title, description, address, property_type, city, country)
+               VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.address, OLD.property_type, OLD.city, OLD.country);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_properties_fts_update
+           AFTER UPDATE OF title, description, address, property_type, city, country ON properties
+           BEGIN
+               INSERT INTO properties_fts (properties_fts, rowid, title, description, address, property_type, city, country)
+               VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.address, OLD.property_type, OLD.city, OLD.country);
+               INSERT INTO properties_fts (rowid, title, description, address, property_type, city, country)
+               VALUES (NEW.id, NEW.title, NEW.description, NEW.address, NEW.property_type, NEW.city, NEW.country);
+           END""",
+        rebuild_search_index,
+    ]),
+    (4, "amenity bitmask on properties", [
+        "ALTER TABLE properties ADD COLUMN amenity_mask INTEGER NOT NULL DEFAULT 0",
+        backfill_amenity_masks,
+    ]),
+    (5, "nightly availability calendar", [
+        # One row per booked night: a date-range availability check is a
+        # primary-key range probe, and two bookings can never share a night.
+        """CREATE TABLE IF NOT EXISTS booking_nights (
+               property_id INTEGER NOT NULL,
+               night DATE NOT NULL,
+               booking_id INTEGER NOT NULL,
+               PRIMARY KEY (property_id, night),
+               FOREIGN KEY (property_id) REFERENCES properties (id),
+               FOREIGN KEY (booking_id) REFERENCES bookings (id)
+           ) WITHOUT ROWID""",
+        rebuild_booking_calendar,
+    ]),
+    (6, "server-side login sessions", [
+        # Keyed by a SHA-256 of the opaque token, so the table alone cannot
+        # be replayed as a cookie. expires_at is unix seconds.
+        """CREATE TABLE IF NOT EXISTS sessions (
+               token_hash TEXT PRIMARY KEY,
+               user_id INTEGER NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               expires_at INTEGER NOT NULL,
+               FOREIGN KEY (user_id) REFERENCES users (id)
+           ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)",
+    ]),
+]
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_is_current(conn: sqlite3.Connection) -> bool:
+    """True if every migration is applied; issues no DDL, unlike current_version."""
+    try:
+        version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        return False  # fresh database: no schema_version table yet
+    return version is not None and version >= LATEST_VERSION
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Apply pending migrations in order and return the versions applied."""
+    conn.commit()
+    applied = []
+    for version, name, steps in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock: another process may have got here first
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+# Index each read path is expected to use; a leading "!" means the text must
+# not appear in the plan. Any full-table SCAN (other than an FTS5 index
+# lookup, which EXPLAIN also reports as a SCAN) fails the audit.
+EXPECTED_PLANS = {
+    'UserManager.authenticate_user': ['sqlite_autoindex_users_1'],
+    'UserManager.get_user_by_id': ['INTEGER PRIMARY KEY'],
+    'PropertyManager.get_properties': ['idx_properties_available_created', '!reviews'],
+    'PropertyManager.get_properties(city)': ['idx_properties_available_city', '!reviews'],
+    'PropertyManager.get_property_by_id': ['INTEGER PRIMARY KEY', '!reviews'],
+    'PropertyManager.get_properties_page': ['idx_properties_available_created', '!TEMP B-TREE'],
+    'PropertyManager.get_properties_page(catalog)': ['INTEGER PRIMARY KEY', '!idx_properties_available_created'],
+    'PropertyManager.get_properties(amenities)': ['idx_properties_available_created', '!reviews'],
+    'PropertyManager.get_properties(dates)': ['idx_properties_available_city',
+                                              'PRIMARY KEY (property_id=? AND night>?', '!bookings'],
+    'PropertyManager.get_properties(search)': ['VIRTUAL TABLE INDEX', 'INTEGER PRIMARY KEY', '!reviews'],
+    'BookingManager.is_property_available': ['PRIMARY KEY (property_id=? AND night>?'],
+    'BookingManager.get_user_bookings': ['idx_bookings_guest_created'],
+    'ReviewManager.get_property_reviews': ['idx_reviews_property'],
+    'SessionManager.resolve': ['PRIMARY KEY (token_hash=?)', 'INTEGER PRIMARY KEY'],
+    'SessionManager.purge_expired': ['idx_sessions_expires'],
+}
+
+def manager_read_paths(db_manager) -> Dict[str, Callable]:
+    """One representative call per manager read path, keyed as in EXPECTED_PLANS."""
+    from datetime import date, timedelta
+    from oikos_auth import UserManager
+    from oikos_properties import PropertyManager
+    from oikos_bookings import BookingManager
+    from oikos_reviews import ReviewManager
+    from oikos_sessions import SessionManager
+    from oikos_catalog import PropertyCatalog
+    
+    users = UserManager(db_manager)
+    bookings = BookingManager(db_manager)
+    reviews = ReviewManager(db_manager)
+    # No result caches, so every call reaches SQLite
+    properties = PropertyManager(db_manager, browse_cache_size=0)
+    sessions = SessionManager(db_manager, cache_size=0)
+    # Loaded up front: the full reload is a deliberate table scan
+    catalog = PropertyCatalog(db_manager)
+    catalog.refresh()
+    catalog_properties = PropertyManager(db_manager, browse_cache_size=0, catalog=catalog)
+    today = date.today()
+    
+    return {
+        'UserManager.authenticate_user': lambda: users.authenticate_user('john_host', 'password123'),
+        'UserManager.get_user_by_id': lambda: users.get_user_by_id(1),
+        'PropertyManager.get_properties': lambda: properties.get_properties(),
+        'PropertyManager.get_properties(city)': lambda: properties.get_properties(
+            city='Par', max_price=500, min_guests=2),
+        'PropertyManager.get_property_by_id': lambda: properties.get_property_by_id(1),
+        'PropertyManager.get_properties_page': lambda: properties.get_properties_page(
+            min_guests=2, limit=12, cursor='["9999-12-31 00:00:00", 1000000]'),
+        'PropertyManager.get_properties_page(catalog)': lambda: catalog_properties.get_properties_page(
+            city='Par', min_guests=2, limit=12),
+        'PropertyManager.get_properties(amenities)': lambda: properties.get_properties(
+            amenities=['Pool', 'WiFi', 'Parking']),
+        'PropertyManager.get_properties(dates)': lambda: properties.get_properties(
+            city='Par', check_in=today, check_out=today + timedelta(days=3)),
+        'PropertyManager.get_properties(search)': lambda: properties.get_properties(
+            search='canal houseboat amsterdam', max_price=500, min_guests=2),
+        'BookingManager.is_property_available': lambda: bookings.is_property_available(
+            1, today, today + timedelta(days=3)),
+        'BookingManager.get_user_bookings': lambda: bookings.get_user_bookings(1),
+        'ReviewManager.get_property_reviews': lambda: reviews.get_property_reviews(1),
+        'SessionManager.resolve': lambda: sessions.resolve('audit-token'),
+        'SessionManager.purge_expired': lambda: sessions.purge_expired(),
+    }
+
+def audit_query_plans(db_manager) -> List[Dict]:
+    """Run every manager read path, EXPLAIN each statement it issues and check the plan.
+    
+    Returns one entry per statement; raises AssertionError if any plan misses
+    its expected index or falls back to a full scan.
+    """
+    calls = manager_read_paths(db_manager)
+    
+    results = []
+    with db_manager.connection() as conn:
+        for name, call in calls.items():
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                call()
+            finally:
+                conn.set_trace_callback(None)
+            
+            for sql in statements:
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                if 'properties_fts_' in sql:
+                    continue  # FTS5 reading its own shadow tables, not a manager query
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                missing = [index for index in EXPECTED_PLANS.get(name, [])
+                           if any(index.lstrip('!') in step for step in plan) == index.startswith('!')]
+                scans = [step for step in plan
+                         if step.startswith('SCAN') and 'VIRTUAL TABLE' not in step]
+                results.append({'call': name, 'sql': " ".join(sql.split()), 'plan': plan,
+                                'missing': missing, 'scans': scans,
+                                'ok': not missing and not scans})
+    
+    failures = [result for result in results if not result['ok']]
+    if failures:
+        raise AssertionError("Query plan audit failed:\n" + "\n".join(
+            f"  {f['call']}: missing={f['missing']} scans={f['scans']} plan={f['plan']}"
+            for f in failures))
+    return results
@@ -0,0 +1,111 @@
+# Oikos Photo Search
+# Needs torch, torchvision and faiss (see requirements.txt); OIKOS_PHOTO_SEARCH=0 turns it off.
+import logging
+import threading
+import time
+from typing import List, Optional
+from simple_image_search import ImageSearch, embedding_name
+
+PHOTO_FEATURES_DIR = "./listing_features"
+# Seconds between syncs with the database, which pick up writes made by other processes
+PHOTO_RESYNC = 300
+
+logger = logging.getLogger("oikos.photo_search")
+
+class ListingPhotoSearch:
+    """Listings whose photo looks like a given image.
+    
+    Each listing's photo is embedded once into a feature store keyed by
+    property id and embedded again only when the image changes. Writes made
+    through the managers wake the indexing thread (see start); searches never
+    wait for it and use the index as of the last sync.
+    image_url is host input, so photos are only ever read as thumbnails of
+    ``image_cache`` (oikos_images.ImageCache), which refuses non-public
+    URLs; without a cache nothing is indexed. Embeddings are keyed by image
+    content and shared with everything else that uses the cache.
+    """
+    
+    def __init__(self, db_manager, store_dir: str = PHOTO_FEATURES_DIR, index_kind: str = 'flat',
+                 resync: float = PHOTO_RESYNC, image_cache=None):
+        self.db = db_manager
+        self.images = image_cache
+        self.resync = resync
+        self.search = ImageSearch(store_dir, index_kind)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._sync_at = 0.0
+        # The index saved by the last sync (or oikos_cli.py index-photos) answers searches right away
+        self.search.load()
+        self.db.add_change_listener(self._on_change)
+    
+    def _on_change(self, table: str, property_id: int = None):
+        if table == 'properties':
+            self._sync_at = 0.0
+            self._wake.set()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether any listing photo is indexed yet."""
+        return len(self.search) > 0
+    
+    def start(self):
+        """Sync in a daemon thread: now, after listing writes and every ``resync`` seconds."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="oikos-photo-index", daemon=True)
+                self._thread.start()
+        return self
+    
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("photo index sync failed")
+            self._wake.wait(max(1.0, self._sync_at - time.monotonic()))
+    
+    def refresh(self, force: bool = False) -> Optional[dict]:
+        """Embed photos of new or edited listings and drop removed ones, if due (or ``force``).
+        
+        Downloads and embeds every changed photo, so it can take minutes:
+        call it from the indexing thread or the CLI, not from a page.
+        """
+        with self._lock:
+            if not force and time.monotonic() < self._sync_at:
+                return None
+            with self.db.connection() as conn:
+                rows = conn.execute("""
+                    SELECT id, image_url FROM properties
+                    WHERE image_url IS NOT NULL AND image_url != ''
+                """).fetchall()
+            self._sync_at = time.monotonic() + self.resync
+            if self.images is None:
+                logger.warning("photo search needs the image cache; not indexing listing photos")
+                return None
+            
+            rows = [(property_id, url) for property_id, url in rows if url.startswith(('http://', 'https://'))]
+            digests = self.images.fetch_many(url for _, url in rows)
+            thumbnails = {}
+            for property_id, url in rows:
+                if digests[url]:
+                    # Evicted since the fetch: fetch again through the cache, never from the URL directly
+                    path = self.images.thumbnail_path(url)
+                    if path is None and self.images.fetch(url):
+                        path = self.images.thumbnail_path(url)
+                    if path is not None:
+                        thumbnails[str(property_id)] = (path, digests[url])
+            digest_of = {key: digest for key, (_, digest) in thumbnails.items()}
+            return self.search.index(
+                sources={key: path for key, (path, _) in thumbnails.items()},
+                versions={key: [digest] for key, digest in digest_of.items()},
+                lookup=lambda key: self.images.load_embedding(digest_of[key], embedding_name()),
+                on_embedded=lambda key, vector: self.images.save_embedding(digest_of[key], embedding_name(), vector))
+    
+    def similar_listings(self, image, limit: int = 12) -> List[int]:
+        """Property ids, most similar photo first, for an uploaded image (bytes, path or URL)."""
+        matches = self.search.query(image, k=limit)
+        if matches is None:
+            raise ValueError("Could not read that image")
+        return [int(key) for key, _ in matches]
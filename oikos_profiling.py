@@ -0,0 +1,131 @@
+# Oikos Rerun Profiling
+# Enable with OIKOS_PROFILE=1; results show on the admin page.
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+
+# Phases a page function reports; time outside any of them is 'other'
+PHASES = ('data', 'html', 'charts', 'widgets')
+SAMPLE_SIZE = 500      # recent timings kept per (page, phase) for percentiles
+RECENT_RERUNS = 50
+
+_current = threading.local()
+_NO_PHASE = nullcontext()
+
+def profiling_enabled() -> bool:
+    return os.environ.get("OIKOS_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+def _percentile(sorted_samples: List[float], pct: float) -> float:
+    return sorted_samples[int(pct / 100 * (len(sorted_samples) - 1))]
+
+class RerunProfiler:
+    """Timings of page functions and their phases, aggregated across reruns and sessions.
+    
+    Phase times are exclusive: a phase nested in another is not counted twice.
+    """
+    
+    def __init__(self, sample_size: int = SAMPLE_SIZE, recent: int = RECENT_RERUNS):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        # (page, phase) -> {'calls', 'total_ms', 'max_ms', 'samples'}
+        self._timings = {}
+        self.recent = deque(maxlen=recent)
+        self.reruns = 0
+    
+    def record(self, page: str, phases: Dict[str, float], total: float):
+        phases = dict(phases, other=max(0.0, total - sum(phases.values())), total=total)
+        with self._lock:
+            self.reruns += 1
+            for name, seconds in phases.items():
+                ms = seconds * 1000
+                entry = self._timings.get((page, name))
+                if entry is None:
+                    entry = self._timings[(page, name)] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                           'samples': deque(maxlen=self._sample_size)}
+                entry['calls'] += 1
+                entry['total_ms'] += ms
+                entry['max_ms'] = max(entry['max_ms'], ms)
+                entry['samples'].append(ms)
+            self.recent.append({'at': time.strftime('%Y-%m-%d %H:%M:%S'), 'page': page,
+                                'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in phases.items()}})
+    
+    def summary(self) -> List[Dict]:
+        """One row per (page, phase): pages by total time, phases in PHASES order."""
+        with self._lock:
+            entries = {key: dict(entry, samples=sorted(entry['samples'])) for key, entry in self._timings.items()}
+        page_totals = {page: entry['total_ms'] for (page, name), entry in entries.items() if name == 'total'}
+        order = ('total',) + PHASES + ('other',)
+        rows = []
+        for (page, name), entry in sorted(entries.items(), key=lambda item: (
+                -page_totals.get(item[0][0], 0), item[0][0],
+                order.index(item[0][1]) if item[0][1] in order else len(order), item[0][1])):
+            samples = entry['samples']
+            rows.append({
+                'page': page,
+                'phase': name,
+                'calls': entry['calls'],
+                'total_ms': round(entry['total_ms'], 2),
+                'mean_ms': round(entry['total_ms'] / entry['calls'], 3),
+                'p50_ms': round(_percentile(samples, 50), 2),
+                'p95_ms': round(_percentile(samples, 95), 2),
+                'max_ms': round(entry['max_ms'], 2),
+                'share': round(entry['total_ms'] / page_totals[page], 3) if page_totals.get(page) else None,
+            })
+        return rows
+    
+    def export_json(self) -> str:
+        with self._lock:
+            reruns, recent = self.reruns, list(self.recent)
+        return json.dumps({'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'reruns': reruns,
+                           'timings': self.summary(), 'recent': recent}, indent=2)
+    
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self.recent.clear()
+            self.reruns = 0
+
+@contextmanager
+def profile_page(profiler, page: str):
+    """Time one run of a page function; a no-op when ``profiler`` is None."""
+    if profiler is None or getattr(_current, 'phases', None) is not None:
+        yield
+        return
+    phases = _current.phases = {}
+    # Time spent in nested phases, one slot per open phase plus the page itself
+    _current.stack = [0.0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - start
+        _current.phases = _current.stack = None
+        profiler.record(page, phases, total)
+
+class _Phase:
+    __slots__ = ('name', 'start')
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        _current.stack.append(0.0)
+        self.start = time.perf_counter()
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stack = _current.stack
+        nested = stack.pop()
+        stack[-1] += elapsed
+        phases = _current.phases
+        phases[self.name] = phases.get(self.name, 0.0) + elapsed - nested
+
+def phase(name: str):
+    """Attribute the enclosed block to ``name`` within the current profile_page."""
+    if getattr(_current, 'phases', None) is None:
+        return _NO_PHASE
+    return _Phase(name)
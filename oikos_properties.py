@@ -1,61 +1,269 @@
 # Oikos Property Management
 import streamlit as st
+import functools
 import json
-from typing import Dict, List, Optional
+import re
+import sys
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from oikos_cache import LRUCache, approx_size
+from oikos_profiling import phase
+
+# Columns hosts may change after listing; see PropertyManager.update_property
+UPDATABLE_FIELDS = (
+    'title', 'description', 'property_type', 'city', 'country', 'address',
+    'price_per_night', 'max_guests', 'bedrooms', 'bathrooms', 'amenities',
+    'image_url', 'is_available',
+)
+
+# Kept in sync by triggers on reviews (migration 2), so browse never reads reviews
+RATING_COLUMNS = """CASE WHEN p.review_count > 0
+                        THEN CAST(p.rating_sum AS REAL) / p.review_count ELSE 0 END as avg_rating,
+                   p.review_count"""
+
+# bm25 column weights: title, description, address, property_type, city, country
+SEARCH_RANK = "bm25(properties_fts, 10.0, 1.0, 2.0, 4.0, 6.0, 3.0)"
+
+def _search_match(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words) or None
+
+# Card image for listings without a photo
+PLACEHOLDER_IMAGE = 'https://images.unsplash.com/photo-1564013799919-ab600027ffc6?w=400'
+
+# Cards per "Load more" page on the browse screen (a multiple of the 3-card row)
+LISTINGS_PAGE_SIZE = 12
+
+# Browse result cache. Writes in this process invalidate it precisely; the TTL
+# bounds staleness from writes made by other processes on the same database.
+BROWSE_CACHE_ENTRIES = 2048
+BROWSE_CACHE_TTL = 30              # seconds
+BROWSE_CACHE_BYTES = 64 * 2 ** 20
+
+# Canonical amenity dictionary: an amenity's bit in properties.amenity_mask is
+# its position here, so only ever append to this list.
+AMENITY_OPTIONS = [
+    "WiFi", "Kitchen", "Parking", "Pool", "Gym", "Air Conditioning",
+    "Heating", "TV", "Washer", "Dryer", "Balcony", "Garden"
+]
+AMENITY_BITS = {amenity: 1 << bit for bit, amenity in enumerate(AMENITY_OPTIONS)}
+
+def amenity_mask(amenities: List[str]) -> int:
+    """Bitmask of the canonical amenities in the list; unknown names are ignored."""
+    mask = 0
+    for amenity in amenities or []:
+        mask |= AMENITY_BITS.get(amenity, 0)
+    return mask
+
+@functools.lru_cache(maxsize=1024)
+def _decode_amenities(amenities_json: str) -> tuple:
+    # Listings share a handful of amenity combinations, so decode each JSON blob once
+    return tuple(json.loads(amenities_json))
+
+def _row_to_property(prop) -> Dict:
+    amenities = list(_decode_amenities(prop[12])) if prop[12] else []
+    return {
+        'id': prop[0],
+        'host_id': prop[1],
+        'title': prop[2],
+        'description': prop[3],
+        'property_type': prop[4],
+        'city': prop[5],
+        'country': prop[6],
+        'address': prop[7],
+        'price_per_night': prop[8],
+        'max_guests': prop[9],
+        'bedrooms': prop[10],
+        'bathrooms': prop[11],
+        'amenities': amenities,
+        'image_url': prop[13],
+        'host_name': f"{prop[16]} {prop[17]}",
+        'avg_rating': round(float(prop[18]), 1) if prop[18] else 0,
+        'review_count': prop[19]
+    }
+
+def _normalize_city(city: Optional[str]) -> Optional[str]:
+    """The city prefix as browse matches it: surrounding whitespace dropped, blank means none."""
+    return (city.strip() or None) if city else None
+
+def _browse_filters(city: str = None, max_price: float = None, min_guests: int = None,
+                    search: str = None, amenities: List[str] = None, check_in: date = None,
+                    check_out: date = None) -> Tuple:
+    """Normalized browse filters: equivalent widget states give equal tuples.
+    
+    ``city`` must already be normalized (_normalize_city). LIKE ignores case
+    for ASCII only, so only ASCII prefixes are folded.
+    """
+    dated = bool(check_in and check_out)
+    return (_search_match(search) if search else None,
+            (city.lower() if city.isascii() else city) if city else None,
+            float(max_price) if max_price else None,
+            int(min_guests) if min_guests else None,
+            amenity_mask(amenities),
+            str(check_in) if dated else None,
+            str(check_out) if dated else None)
+
+def _could_match(filters: Tuple, listing: Tuple) -> bool:
+    """Whether a listing (city, price, max_guests, amenity_mask, is_available) can pass
+    the filters, ignoring free text and dates. Errs towards True."""
+    _, city, max_price, min_guests, mask, _, _ = filters
+    listing_city, price, guests, listing_mask, available = listing
+    if not available:
+        return False
+    if city and not ('%' in city or '_' in city or listing_city.lower().startswith(city.lower())):
+        return False
+    if max_price is not None and price > max_price:
+        return False
+    if min_guests is not None and guests < min_guests:
+        return False
+    return listing_mask & mask == mask
+
+def _browse_entry_size(entry: Tuple) -> int:
+    # Sizing every row of a big result costs about as much as the query did; extrapolate
+    rows, next_cursor, ids = entry
+    sample = rows[:32]
+    per_row = approx_size(sample) / len(sample) if sample else 0
+    return int(per_row * len(rows)) + approx_size(next_cursor) + sys.getsizeof(ids) + 28 * len(ids)
 
 class PropertyManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, cache_size: int = 4096, browse_cache_size: int = BROWSE_CACHE_ENTRIES,
+                 browse_cache_ttl: float = BROWSE_CACHE_TTL, browse_cache_bytes: int = BROWSE_CACHE_BYTES,
+                 catalog=None):
         self.db = db_manager
+        # Optional oikos_catalog.PropertyCatalog that answers browse pages from memory
+        self.catalog = catalog
+        self._by_id = LRUCache(cache_size)
+        # (method, filters, limit, cursor) -> (rows, next cursor, ids of the rows)
+        self._browse = LRUCache(browse_cache_size, ttl=browse_cache_ttl, max_bytes=browse_cache_bytes,
+                                sizeof=_browse_entry_size)
+        self._generation = 0
+        self.db.add_change_listener(self._on_change)
+    
+    @property
+    def generation(self) -> int:
+        """Bumped by every listing, booking or review write made in this process."""
+        return self._generation
+    
+    def _on_change(self, table: str, property_id: int = None):
+        if table not in ('properties', 'reviews', 'bookings'):
+            return
+        self._generation += 1
+        if table != 'bookings':
+            if property_id is None:
+                self._by_id.clear()
+            else:
+                self._by_id.invalidate(property_id)
+        
+        if property_id is None:
+            if table == 'bookings':
+                self._browse.invalidate_where(lambda key, entry: key[1][5] is not None)
+            else:
+                self._browse.clear()
+        elif table == 'reviews':
+            # Ratings are shown but never filtered on
+            self._browse.invalidate_where(lambda key, entry: property_id in entry[2])
+        elif len(self._browse):
+            # A created or edited listing can join any result it now matches; a
+            # booking only changes results filtered by dates
+            listing = self._listing_facts(property_id)
+            dated_only = table == 'bookings'
+            self._browse.invalidate_where(lambda key, entry: (
+                (not dated_only or key[1][5] is not None)
+                and (property_id in entry[2] or (listing is not None and _could_match(key[1], listing)))))
+    
+    def _listing_facts(self, property_id: int) -> Optional[Tuple]:
+        with self.db.connection() as conn:
+            return conn.execute("""
+                SELECT city, price_per_night, max_guests, amenity_mask, is_available
+                FROM properties WHERE id = ?
+            """, (property_id,)).fetchone()
+    
+    def cache_stats(self) -> Dict[str, dict]:
+        return {'by_id': self._by_id.stats(), 'browse': self._browse.stats()}
     
     def create_property(self, host_id: int, title: str, description: str,
                        property_type: str, city: str, country: str, address: str,
                        price_per_night: float, max_guests: int, bedrooms: int,
                        bathrooms: int, amenities: List[str], image_url: str = None) -> bool:
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
             amenities_json = json.dumps(amenities)
             
-            cursor.execute("""
-                INSERT INTO properties (host_id, title, description, property_type,
-                                      city, country, address, price_per_night, max_guests,
-                                      bedrooms, bathrooms, amenities, image_url)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (host_id, title, description, property_type, city, country,
-                  address, price_per_night, max_guests, bedrooms, bathrooms,
-                  amenities_json, image_url))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO properties (host_id, title, description, property_type,
+                                          city, country, address, price_per_night, max_guests,
+                                          bedrooms, bathrooms, amenities, amenity_mask, image_url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (host_id, title, description, property_type, city, country,
+                      address, price_per_night, max_guests, bedrooms, bathrooms,
+                      amenities_json, amenity_mask(amenities), image_url))
+                conn.commit()
+            self.db.notify_change('properties', cursor.lastrowid)
             return True
         except Exception as e:
             st.error(f"Error creating property: {e}")
             return False
     
-    def get_properties(self, city: str = None, max_price: float = None,
-                      min_guests: int = None) -> List[Dict]:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+    def update_property(self, property_id: int, **fields) -> bool:
+        unknown = set(fields) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update property fields: {sorted(unknown)}")
+        if not fields:
+            return False
+        if 'amenities' in fields:
+            fields['amenity_mask'] = amenity_mask(fields['amenities'])
+            fields['amenities'] = json.dumps(fields['amenities'])
+        
+        try:
+            assignments = ", ".join(f"{field} = ?" for field in fields)
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"UPDATE properties SET {assignments} WHERE id = ?",
+                               (*fields.values(), property_id))
+                conn.commit()
+            self.db.notify_change('properties', property_id)
+            return cursor.rowcount > 0
+        except Exception as e:
+            st.error(f"Error updating property: {e}")
+            return False
+    
+    def _browse_query(self, city: str = None, max_price: float = None,
+                      min_guests: int = None, search: str = None,
+                      amenities: List[str] = None, check_in: date = None,
+                      check_out: date = None) -> Tuple[str, List, str, bool]:
+        """Build the browse SELECT; returns (sql, params, sort key, descending).
         
-        query = """
+        Free-text searches rank by bm25 relevance, everything else lists newest first.
+        """
+        match = _search_match(search) if search else None
+        sort_key, descending = (SEARCH_RANK, False) if match else ("p.created_at", True)
+        
+        query = f"""
             SELECT p.id, p.host_id, p.title, p.description, p.property_type, 
                    p.city, p.country, p.address, p.price_per_night, p.max_guests,
                    p.bedrooms, p.bathrooms, p.amenities, p.image_url, p.created_at, p.is_available,
                    u.first_name, u.last_name,
-                   COALESCE(AVG(CAST(r.rating AS REAL)), 0) as avg_rating,
-                   COUNT(r.id) as review_count
+                   {RATING_COLUMNS},
+                   {sort_key} as sort_key
             FROM properties p
             JOIN users u ON p.host_id = u.id
-            LEFT JOIN reviews r ON p.id = r.property_id
+            {"JOIN properties_fts ON properties_fts.rowid = p.id" if match else ""}
             WHERE p.is_available = TRUE
         """
         
         params = []
         
+        if match:
+            query += " AND properties_fts MATCH ?"
+            params.append(match)
+        
         if city:
-            query += " AND LOWER(p.city) LIKE LOWER(?)"
-            params.append(f"%{city}%")
+            # Prefix match so idx_properties_available_city can be used
+            query += " AND p.city LIKE ?"
+            params.append(f"{city}%")
         
         if max_price:
             query += " AND p.price_per_night <= ?"
@@ -65,98 +273,282 @@ class PropertyManager:
             query += " AND p.max_guests >= ?"
             params.append(min_guests)
         
-        query += " GROUP BY p.id ORDER BY p.created_at DESC"
-        
-        cursor.execute(query, params)
-        properties = cursor.fetchall()
-        conn.close()
-        
-        result = []
-        for prop in properties:
-            amenities = json.loads(prop[12]) if prop[12] else []
-            result.append({
-                'id': prop[0],
-                'host_id': prop[1],
-                'title': prop[2],
-                'description': prop[3],
-                'property_type': prop[4],
-                'city': prop[5],
-                'country': prop[6],
-                'address': prop[7],
-                'price_per_night': prop[8],
-                'max_guests': prop[9],
-                'bedrooms': prop[10],
-                'bathrooms': prop[11],
-                'amenities': amenities,
-                'image_url': prop[13],
-                'host_name': f"{prop[16]} {prop[17]}",
-                'avg_rating': round(float(prop[18]), 1) if prop[18] else 0,
-                'review_count': prop[19]
-            })
-        
-        return result
-    
-    def get_property_by_id(self, property_id: int) -> Optional[Dict]:
-        properties = self.get_properties()
-        for prop in properties:
-            if prop['id'] == property_id:
-                return prop
-        return None
-
-def show_property_listings(property_manager, booking_manager, review_manager):
-    # Enhanced Hero Section with Search
-    st.markdown("""
-    <div class="hero-section" style="animation: fadeInUp 1.2s ease-out;">
-        <div class="hero-title" style="animation: bounceIn 1.5s ease-out;">Find Your Perfect Stay</div>
-        <div class="hero-subtitle" style="animation: slideInLeft 1s ease-out 0.5s both;">Discover unique accommodations in the world's most amazing destinations</div>
-        <div style="display: flex; justify-content: center; gap: 3rem; margin-top: 3rem; animation: fadeInUp 1s ease-out 1s both;">
-            <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.2s both;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">🌍</div>
-                <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Global Destinations</div>
-            </div>
-            <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.4s both;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">⭐</div>
-                <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Premium Quality</div>
-            </div>
-            <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.6s both;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">🔒</div>
-                <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Secure Booking</div>
-            </div>
-            <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.8s both;">
-                <div style="font-size: 3rem; margin-bottom: 0.5rem;">💎</div>
-                <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Luxury Experience</div>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+        if amenities:
+            unknown = [amenity for amenity in amenities if amenity not in AMENITY_BITS]
+            if unknown:
+                raise ValueError(f"Unknown amenities: {unknown}")
+            # Listing must have every requested amenity bit set
+            required = amenity_mask(amenities)
+            query += " AND (p.amenity_mask & ?) = ?"
+            params += [required, required]
+        
+        if check_in and check_out:
+            # Free for the stay if no night in [check_in, check_out) is booked
+            query += """ AND NOT EXISTS (SELECT 1 FROM booking_nights n
+                                         WHERE n.property_id = p.id
+                                         AND n.night >= ? AND n.night < ?)"""
+            params += [str(check_in), str(check_out)]
+        
+        return query, params, sort_key, descending
     
-    # Advanced Search Container
-    st.markdown('<div class="search-container">', unsafe_allow_html=True)
+    def get_properties(self, city: str = None, max_price: float = None,
+                      min_guests: int = None, search: str = None,
+                      amenities: List[str] = None, check_in: date = None,
+                      check_out: date = None) -> List[Dict]:
+        """Available listings matching every filter given.
+        
+        ``city`` matches the start of the city name ('New' finds New York,
+        'York' does not) so the city index can be used; ``search`` matches
+        the start of any word, city included.
+        """
+        city = _normalize_city(city)
+        query, params, _, descending = self._browse_query(city, max_price, min_guests, search,
+                                                          amenities, check_in, check_out)
+        key = ('all', _browse_filters(city, max_price, min_guests, search, amenities, check_in, check_out),
+               None, None)
+        cached = self._browse.get(key)
+        if cached is not None:
+            return [dict(prop) for prop in cached[0]]
+        
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY sort_key {direction}, p.id {direction}"
+        
+        generation = self._generation
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            properties = cursor.fetchall()
+        
+        result = [_row_to_property(prop) for prop in properties]
+        self._cache_browse(key, generation, result, None)
+        return [dict(prop) for prop in result]
     
-    col1, col2, col3, col4 = st.columns(4)
+    def _cache_browse(self, key: Tuple, generation: int, rows: List[Dict], next_cursor: Optional[str]):
+        # Skip the cache fill if an invalidation raced with the read
+        if generation == self._generation:
+            self._browse.put(key, (rows, next_cursor, frozenset(prop['id'] for prop in rows)))
     
-    with col1:
-        city_filter = st.text_input("", placeholder="🌍 Where are you going?", key="city_search")
+    def get_properties_page(self, city: str = None, max_price: float = None,
+                            min_guests: int = None, search: str = None,
+                            amenities: List[str] = None, check_in: date = None,
+                            check_out: date = None, limit: int = 12,
+                            cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of get_properties() results, in the same order.
+        
+        Pass the returned cursor back in to fetch the next page; it is None on
+        the last page. Keyset paging on (sort key, id) keeps every page an
+        index range seek, however deep the user scrolls.
+        """
+        city = _normalize_city(city)
+        query, params, sort_key, descending = self._browse_query(city, max_price, min_guests, search,
+                                                                 amenities, check_in, check_out)
+        key = ('page', _browse_filters(city, max_price, min_guests, search, amenities, check_in, check_out),
+               limit, cursor)
+        cached = self._browse.get(key)
+        if cached is not None:
+            return [dict(prop) for prop in cached[0]], cached[1]
+        
+        direction = "DESC" if descending else "ASC"
+        if cursor:
+            query += f" AND ({sort_key}, p.id) {'<' if descending else '>'} (?, ?)"
+            params += json.loads(cursor)
+        query += f" ORDER BY sort_key {direction}, p.id {direction} LIMIT ?"
+        params.append(limit + 1)
+        
+        generation = self._generation
+        found = None
+        if self.catalog is not None:
+            found = self.catalog.page(city, max_price, min_guests, search, amenities, check_in, check_out,
+                                      limit=limit, cursor=cursor)
+        if found is not None:
+            ids, more = found
+            page = self._rows_by_ids(ids)
+            next_cursor = json.dumps([page[-1][20], page[-1][0]]) if more and page else None
+        else:
+            with self.db.connection() as conn:
+                rows = conn.execute(query, params).fetchall()
+            page = rows[:limit]
+            next_cursor = json.dumps([page[-1][20], page[-1][0]]) if len(rows) > limit else None
+        result = [_row_to_property(prop) for prop in page]
+        self._cache_browse(key, generation, result, next_cursor)
+        return [dict(prop) for prop in result], next_cursor
     
-    with col2:
-        max_price = st.number_input("", min_value=0, value=1000, step=50, 
-                                  help="💰 Maximum price per night", key="price_search")
+    def _rows_by_ids(self, ids: List[int]) -> List[tuple]:
+        """Browse rows (as selected by _browse_query without search) for ``ids``, in that order."""
+        if not ids:
+            return []
+        # The unary + keeps SQLite on the primary key instead of idx_properties_available_created
+        with self.db.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT p.id, p.host_id, p.title, p.description, p.property_type, 
+                       p.city, p.country, p.address, p.price_per_night, p.max_guests,
+                       p.bedrooms, p.bathrooms, p.amenities, p.image_url, p.created_at, p.is_available,
+                       u.first_name, u.last_name,
+                       {RATING_COLUMNS},
+                       p.created_at as sort_key
+                FROM properties p
+                JOIN users u ON p.host_id = u.id
+                WHERE p.id IN ({", ".join("?" * len(ids))}) AND +p.is_available = TRUE
+            """, ids).fetchall()
+        by_id = {row[0]: row for row in rows}
+        return [by_id[property_id] for property_id in ids if property_id in by_id]
     
-    with col3:
-        min_guests = st.number_input("", min_value=1, value=1, step=1,
-                                   help="👥 Number of guests", key="guests_search")
+    def get_properties_by_ids(self, ids: List[int]) -> List[Dict]:
+        """Available listings among ``ids``, in the order given (e.g. photo search results)."""
+        return [_row_to_property(prop) for prop in self._rows_by_ids(ids)]
     
-    with col4:
-        search_btn = st.button("🔍 Search Properties", use_container_width=True, key="search_btn")
+    def get_property_by_id(self, property_id: int) -> Optional[Dict]:
+        cached = self._by_id.get(property_id)
+        if cached is not None:
+            return dict(cached)
+        
+        generation = self._generation
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT p.id, p.host_id, p.title, p.description, p.property_type, 
+                       p.city, p.country, p.address, p.price_per_night, p.max_guests,
+                       p.bedrooms, p.bathrooms, p.amenities, p.image_url, p.created_at, p.is_available,
+                       u.first_name, u.last_name,
+                       {RATING_COLUMNS}
+                FROM properties p
+                JOIN users u ON p.host_id = u.id
+                WHERE p.id = ? AND p.is_available = TRUE
+            """, (property_id,))
+            prop = cursor.fetchone()
+        
+        if prop is None:
+            return None
+        result = _row_to_property(prop)
+        # Skip the cache fill if an invalidation raced with the read
+        if generation == self._generation:
+            self._by_id.put(property_id, result)
+        return dict(result)
+
+def _load_listing_pages(property_manager, filters: Dict, pages: int) -> Tuple[List[Dict], Optional[str]]:
+    """The first ``pages`` browse pages for ``filters`` and the cursor after them."""
+    rows, cursor = [], None
+    for _ in range(pages):
+        page, cursor = property_manager.get_properties_page(**filters, limit=LISTINGS_PAGE_SIZE, cursor=cursor)
+        rows += page
+        if cursor is None:
+            break
+    return rows, cursor
+
+def show_property_listings(property_manager, booking_manager, review_manager, photo_search=None,
+                           image_cache=None):
+    with phase('widgets'):
+        # Enhanced Hero Section with Search
+        st.markdown("""
+        <div class="hero-section" style="animation: fadeInUp 1.2s ease-out;">
+            <div class="hero-title" style="animation: bounceIn 1.5s ease-out;">Find Your Perfect Stay</div>
+            <div class="hero-subtitle" style="animation: slideInLeft 1s ease-out 0.5s both;">Discover unique accommodations in the world's most amazing destinations</div>
+            <div style="display: flex; justify-content: center; gap: 3rem; margin-top: 3rem; animation: fadeInUp 1s ease-out 1s both;">
+                <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.2s both;">
+                    <div style="font-size: 3rem; margin-bottom: 0.5rem;">🌍</div>
+                    <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Global Destinations</div>
+                </div>
+                <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.4s both;">
+                    <div style="font-size: 3rem; margin-bottom: 0.5rem;">⭐</div>
+                    <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Premium Quality</div>
+                </div>
+                <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.6s both;">
+                    <div style="font-size: 3rem; margin-bottom: 0.5rem;">🔒</div>
+                    <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Secure Booking</div>
+                </div>
+                <div style="text-align: center; animation: bounceIn 0.8s ease-out 1.8s both;">
+                    <div style="font-size: 3rem; margin-bottom: 0.5rem;">💎</div>
+                    <div style="font-size: 1rem; opacity: 0.9; font-weight: 500;">Luxury Experience</div>
+                </div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Advanced Search Container
+        st.markdown('<div class="search-container">', unsafe_allow_html=True)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            search_text = st.text_input("", placeholder="🌍 Where are you going? Try 'canal houseboat amsterdam'",
+                                        help="Matches the start of any word in the city, country, title or "
+                                             "description: 'york' finds New York",
+                                        key="city_search")
+        
+        with col2:
+            max_price = st.number_input("", min_value=0, value=1000, step=50, 
+                                      help="💰 Maximum price per night", key="price_search")
+        
+        with col3:
+            min_guests = st.number_input("", min_value=1, value=1, step=1,
+                                       help="👥 Number of guests", key="guests_search")
+        
+        with col4:
+            search_btn = st.button("🔍 Search Properties", use_container_width=True, key="search_btn")
+        
+        col5, col6 = st.columns(2)
+        
+        with col5:
+            stay_dates = st.date_input("", value=(), min_value=date.today(),
+                                       help="📅 Only show places free for these dates", key="dates_search")
+        
+        with col6:
+            amenity_filter = st.multiselect("", AMENITY_OPTIONS, placeholder="✨ Must have amenities",
+                                            key="amenity_search")
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        photo = None
+        if photo_search is not None:
+            with st.expander("📷 Find listings that look like this photo"):
+                photo = st.file_uploader("", type=["jpg", "jpeg", "png", "webp"], key="photo_search")
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    if photo is not None and not photo_search.ready:
+        st.info("Photo search is still indexing listing photos. Try again in a few minutes.")
+        photo = None
     
-    # Get properties based on filters
-    properties = property_manager.get_properties(
-        city=city_filter if city_filter else None,
-        max_price=max_price,
-        min_guests=min_guests
-    )
+    # A photo replaces the filters: show the most similar listings instead
+    if photo is not None:
+        with phase('data'):
+            photo_key = (photo.name, photo.size)
+            if st.session_state.get('photo_results', (None,))[0] != photo_key:
+                try:
+                    with st.spinner("Looking for similar listings..."):
+                        ids = photo_search.similar_listings(photo.getvalue(), limit=LISTINGS_PAGE_SIZE)
+                    st.session_state.photo_results = (photo_key, property_manager.get_properties_by_ids(ids))
+                except ValueError as e:
+                    st.error(str(e))
+                    return
+            properties = st.session_state.photo_results[1]
+            cursor = None
+    else:
+        # Get properties based on filters, one page at a time. Loaded pages are
+        # kept in session state and start over whenever the filters change.
+        with phase('data'):
+            filters = dict(
+                search=search_text if search_text else None,
+                max_price=max_price,
+                min_guests=min_guests,
+                amenities=amenity_filter,
+                check_in=stay_dates[0] if len(stay_dates) == 2 else None,
+                check_out=stay_dates[1] if len(stay_dates) == 2 else None
+            )
+            # Loaded pages are fetched again after any write in this process (a
+            # booked listing must drop out of a dated search) and once older than
+            # the browse cache TTL, which covers writes from other processes.
+            same_filters = st.session_state.get('listing_filters') == filters
+            if (not same_filters
+                    or st.session_state.get('listing_generation') != property_manager.generation
+                    or time.monotonic() - st.session_state.get('listing_loaded_at', 0) > BROWSE_CACHE_TTL):
+                pages = st.session_state.get('listing_pages', 1) if same_filters else 1
+                st.session_state.listing_filters = filters
+                st.session_state.listing_generation = property_manager.generation
+                st.session_state.listing_loaded_at = time.monotonic()
+                st.session_state.listing_pages = pages
+                st.session_state.listing_rows, st.session_state.listing_cursor = \
+                    _load_listing_pages(property_manager, filters, pages)
+            properties = st.session_state.listing_rows
+            cursor = st.session_state.listing_cursor
     
     if not properties:
         st.info("No properties found matching your criteria. Try adjusting your filters.")
@@ -174,56 +566,70 @@ def show_property_listings(property_manager, booking_manager, review_manager):
                 
                 with col:
                     # Create professional property card
-                    card_html = f"""
-                    <div class="property-card">
-                        <div class="property-image">
-                            <img src="{prop['image_url'] if prop['image_url'] else 'https://images.unsplash.com/photo-1564013799919-ab600027ffc6?w=400'}" 
-                                 alt="{prop['title']}" />
-                        </div>
-                        <div class="property-content">
-                            <div class="property-title">{prop['title']}</div>
-                            <div class="property-location">📍 {prop['city']}, {prop['country']}</div>
-                            <div class="property-details">
-                                <span>🏠 {prop['property_type']}</span>
-                                <span>🛏️ {prop['bedrooms']} bed</span>
-                                <span>🚿 {prop['bathrooms']} bath</span>
+                    with phase('html'):
+                        image_url = prop['image_url'] or PLACEHOLDER_IMAGE
+                        card_html = f"""
+                        <div class="property-card">
+                            <div class="property-image">
+                                <img src="{image_cache.card_src(image_url) if image_cache else image_url}" 
+                                     alt="{prop['title']}" />
                             </div>
-                            <div class="property-rating">
-                                <span class="rating-stars">{'⭐' * int(prop['avg_rating']) if prop['avg_rating'] > 0 else '⭐'}</span>
-                                <span class="rating-text">{prop['avg_rating'] if prop['avg_rating'] > 0 else 'New'} ({prop['review_count']} reviews)</span>
-                            </div>
-                            <div class="property-footer">
-                                <div>
-                                    <span class="price-tag">${prop['price_per_night']:.0f}</span>
-                                    <span class="price-night"> / night</span>
+                            <div class="property-content">
+                                <div class="property-title">{prop['title']}</div>
+                                <div class="property-location">📍 {prop['city']}, {prop['country']}</div>
+                                <div class="property-details">
+                                    <span>🏠 {prop['property_type']}</span>
+                                    <span>🛏️ {prop['bedrooms']} bed</span>
+                                    <span>🚿 {prop['bathrooms']} bath</span>
+                                </div>
+                                <div class="property-rating">
+                                    <span class="rating-stars">{'⭐' * int(prop['avg_rating']) if prop['avg_rating'] > 0 else '⭐'}</span>
+                                    <span class="rating-text">{prop['avg_rating'] if prop['avg_rating'] > 0 else 'New'} ({prop['review_count']} reviews)</span>
+                                </div>
+                                <div class="property-footer">
+                                    <div>
+                                        <span class="price-tag">${prop['price_per_night']:.0f}</span>
+                                        <span class="price-night"> / night</span>
+                                    </div>
                                 </div>
                             </div>
                         </div>
-                    </div>
-                    """
-                    
-                    st.markdown(card_html, unsafe_allow_html=True)
-                    
-                    # Book button
-                    if st.button(f"Book Now", key=f"book_{prop['id']}", use_container_width=True):
-                        st.session_state.selected_property = prop
-                        st.session_state.show_booking = True
-                    
-                    # Amenities tags
-                    if prop['amenities']:
+                        """
+                        
                         amenities_html = ""
                         for amenity in prop['amenities'][:4]:
                             amenities_html += f'<span class="amenity-tag">{amenity}</span>'
                         if len(prop['amenities']) > 4:
                             amenities_html += f'<span class="amenity-tag">+{len(prop["amenities"]) - 4} more</span>'
-                        st.markdown(amenities_html, unsafe_allow_html=True)
                     
-                    st.markdown("<br>", unsafe_allow_html=True)
+                    with phase('widgets'):
+                        st.markdown(card_html, unsafe_allow_html=True)
+                        
+                        # Book button
+                        if st.button(f"Book Now", key=f"book_{prop['id']}", use_container_width=True):
+                            st.session_state.selected_property = prop
+                            st.session_state.show_booking = True
+                        
+                        # Amenities tags
+                        if amenities_html:
+                            st.markdown(amenities_html, unsafe_allow_html=True)
+                        
+                        st.markdown("<br>", unsafe_allow_html=True)
+    
+    if cursor:
+        if st.button("Load more properties", key="load_more_listings", use_container_width=True):
+            with phase('data'):
+                rows, st.session_state.listing_cursor = property_manager.get_properties_page(
+                    **filters, limit=LISTINGS_PAGE_SIZE, cursor=st.session_state.listing_cursor)
+                st.session_state.listing_rows = properties + rows
+                st.session_state.listing_pages += 1
+            st.rerun()
 
-def show_host_property(property_manager):
-    st.markdown('<h1 class="main-header">🏡 Host Your Property</h1>', unsafe_allow_html=True)
+def show_host_property(property_manager, user):
+    with phase('widgets'):
+        st.markdown('<h1 class="main-header">🏡 Host Your Property</h1>', unsafe_allow_html=True)
     
-    with st.form("host_property_form"):
+    with phase('widgets'), st.form("host_property_form"):
         col1, col2 = st.columns(2)
         
         with col1:
@@ -250,12 +656,8 @@ def show_host_property(property_manager):
         amenity_cols = st.columns(4)
         
         amenities = []
-        amenity_options = [
-            "WiFi", "Kitchen", "Parking", "Pool", "Gym", "Air Conditioning",
-            "Heating", "TV", "Washer", "Dryer", "Balcony", "Garden"
-        ]
         
-        for i, amenity in enumerate(amenity_options):
+        for i, amenity in enumerate(AMENITY_OPTIONS):
             with amenity_cols[i % 4]:
                 if st.checkbox(amenity):
                     amenities.append(amenity)
@@ -266,13 +668,17 @@ def show_host_property(property_manager):
             required_fields = [title, property_type, city, country, address, price_per_night, description]
             
             if all(required_fields):
-                if property_manager.create_property(
-                    st.session_state.user['id'],
-                    title, description, property_type, city, country, address,
-                    price_per_night, max_guests, bedrooms, bathrooms,
-                    amenities, image_url
-                ):
+                with phase('data'):
+                    created = property_manager.create_property(
+                        user['id'],
+                        title, description, property_type, city, country, address,
+                        price_per_night, max_guests, bedrooms, bathrooms,
+                        amenities, image_url
+                    )
+                if created:
                     st.success("Property listed successfully!")
+                    # Make the browse page reload so the new listing shows up
+                    st.session_state.pop('listing_filters', None)
                 else:
                     st.error("Failed to list property. Please try again.")
             else:
@@ -0,0 +1,215 @@
+# Oikos Query Instrumentation
+import bisect
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List
+
+logger = logging.getLogger("oikos.slow_queries")
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches the rest
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+SLOW_QUERY_MS = 50.0
+SLOW_LOG_SIZE = 200
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_THIS_FILE = os.path.normcase(__file__)
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+def _call_site() -> str:
+    """file:line function of the first frame outside this module and contextlib."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.normcase(filename) != _THIS_FILE and 'contextlib' not in filename:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+class QueryStats:
+    """Per-statement latency histograms, row counts and call sites, plus a slow-query log.
+    
+    Latency is time spent inside SQLite for a statement: its execute plus
+    every fetch of its rows.
+    """
+    
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, slow_log_size: int = SLOW_LOG_SIZE):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._queries = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+    
+    def record(self, sql: str, seconds: float, rows: int, site: str, plan: List[str] = None):
+        key = _normalize(sql)
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                entry = self._queries[key] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                                              'histogram': [0] * len(HISTOGRAM_BOUNDS_MS),
+                                              'sites': Counter()}
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['rows'] += rows
+            entry['histogram'][bisect.bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+            entry['sites'][site] += 1
+            if plan is not None:
+                self.slow_log.append({'at': time.strftime('%Y-%m-%d %H:%M:%S'), 'ms': round(ms, 2),
+                                      'rows': rows, 'site': site, 'sql': key, 'plan': plan})
+        if plan is not None:
+            logger.warning("slow query %.1f ms (%d rows) at %s: %s | plan: %s",
+                           ms, rows, site, key, " | ".join(plan))
+    
+    def _percentile_ms(self, histogram: List[int], pct: float, max_ms: float) -> float:
+        """Upper bound of the bucket holding the percentile, capped at the slowest call seen."""
+        target = sum(histogram) * pct / 100
+        seen = 0
+        for count, bound in zip(histogram, HISTOGRAM_BOUNDS_MS):
+            seen += count
+            if seen >= target:
+                break
+        # The overflow bucket has no finite bound (JSON would get Infinity)
+        return min(bound, round(max_ms, 2))
+    
+    def summary(self, top: int = 20, order_by: str = 'total_ms') -> List[Dict]:
+        """The ``top`` statements by total time (or 'calls', 'max_ms', 'rows')."""
+        with self._lock:
+            entries = [(sql, dict(entry, histogram=list(entry['histogram']), sites=Counter(entry['sites'])))
+                       for sql, entry in self._queries.items()]
+        entries.sort(key=lambda item: item[1][order_by], reverse=True)
+        return [{
+            'sql': sql,
+            'calls': entry['calls'],
+            'total_ms': round(entry['total_ms'], 2),
+            'mean_ms': round(entry['total_ms'] / entry['calls'], 3),
+            'p95_ms': self._percentile_ms(entry['histogram'], 95, entry['max_ms']),
+            'max_ms': round(entry['max_ms'], 2),
+            'rows': entry['rows'],
+            'histogram': dict(zip((str(bound) for bound in HISTOGRAM_BOUNDS_MS), entry['histogram'])),
+            'call_sites': dict(entry['sites'].most_common(3)),
+        } for sql, entry in entries[:top]]
+    
+    def slow_queries(self) -> List[Dict]:
+        """A copy of the slow-query log, oldest first; the deque itself changes under other threads."""
+        with self._lock:
+            return list(self.slow_log)
+    
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self.slow_log.clear()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to its connection's QueryStats once the statement is done."""
+    
+    _pending = None
+    
+    def execute(self, sql, parameters=()):
+        self._finish()
+        site = _call_site()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - start, 0, site]
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        site = _call_site()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # Parameters are consumed by now, so executemany is never EXPLAINed
+            self._pending = [sql, None, time.perf_counter() - start, 0, site]
+    
+    def _fetched(self, seconds: float, rows: int, exhausted: bool):
+        if self._pending is not None:
+            self._pending[2] += seconds
+            self._pending[3] += rows
+            if exhausted:
+                self._finish()
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - start, row is not None, row is None)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(time.perf_counter() - start, len(rows), not rows)
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - start, len(rows), True)
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(time.perf_counter() - start, 0, True)
+            raise
+        self._fetched(time.perf_counter() - start, 1, False)
+        return row
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+    
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, parameters, seconds, rows, site = pending
+        stats = getattr(self.connection, 'query_stats', None)
+        if stats is None:
+            return
+        if not rows and self.rowcount > 0:
+            rows = self.rowcount  # INSERT/UPDATE/DELETE
+        plan = None
+        if seconds * 1000 >= stats.slow_ms:
+            plan = self._explain(sql, parameters)
+        stats.record(sql, seconds, rows, site, plan)
+    
+    def _explain(self, sql: str, parameters) -> List[str]:
+        if parameters is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return []
+        try:
+            # A plain cursor, so EXPLAIN itself is not instrumented
+            cursor = sqlite3.Cursor(self.connection)
+            return [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+        except sqlite3.Error as e:
+            return [f"(EXPLAIN failed: {e})"]
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=InstrumentedConnection); set ``query_stats`` afterwards."""
+    
+    query_stats = None
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    # The C implementations of these bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
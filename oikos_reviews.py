@@ -9,35 +9,30 @@ class ReviewManager:
     def create_review(self, property_id: int, guest_id: int, booking_id: int,
                      rating: int, comment: str) -> bool:
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO reviews (property_id, guest_id, booking_id, rating, comment)
-                VALUES (?, ?, ?, ?, ?)
-            """, (property_id, guest_id, booking_id, rating, comment))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO reviews (property_id, guest_id, booking_id, rating, comment)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (property_id, guest_id, booking_id, rating, comment))
+                conn.commit()
+            self.db.notify_change('reviews', property_id)
             return True
         except Exception as e:
             st.error(f"Error creating review: {e}")
             return False
     
     def get_property_reviews(self, property_id: int) -> List[Dict]:
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT r.*, u.first_name, u.last_name
-            FROM reviews r
-            JOIN users u ON r.guest_id = u.id
-            WHERE r.property_id = ?
-            ORDER BY r.created_at DESC
-        """, (property_id,))
-        
-        reviews = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT r.*, u.first_name, u.last_name
+                FROM reviews r
+                JOIN users u ON r.guest_id = u.id
+                WHERE r.property_id = ?
+                ORDER BY r.created_at DESC
+            """, (property_id,))
+            reviews = cursor.fetchall()
         
         result = []
         for review in reviews:
@@ -51,7 +46,7 @@ class ReviewManager:
         
         return result
 
-def show_review_form(booking, review_manager):
+def show_review_form(booking, review_manager, user):
     st.markdown(f"### Leave a Review for {booking['property_title']}")
     
     with st.form(f"review_form_{booking['id']}"):
@@ -65,7 +60,7 @@ def show_review_form(booking, review_manager):
         if submit_btn:
             if review_manager.create_review(
                 booking['property_id'],
-                st.session_state.user['id'],
+                user['id'],
                 booking['id'],
                 rating,
                 comment
@@ -0,0 +1,129 @@
+# Oikos Login Sessions
+import hashlib
+import secrets
+import threading
+import time
+from typing import Dict, Optional
+from oikos_cache import LRUCache
+
+SESSION_TTL = 7 * 24 * 3600   # seconds
+SESSION_RECHECK = 60          # seconds a cached session is trusted before re-reading SQLite
+PURGE_INTERVAL = 3600         # seconds between opportunistic purges of expired rows
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class SessionManager:
+    """Opaque login tokens backed by the sessions table.
+    
+    SQLite is the source of truth, so any process sharing the database can
+    resolve any token (the app keeps tokens in st.session_state only, so in
+    practice a login lasts one browser connection). Each process keeps an LRU of recently resolved sessions
+    and only goes back to SQLite after SESSION_RECHECK seconds; a revocation
+    made on another replica therefore takes effect within that window.
+    """
+    
+    def __init__(self, db_manager, ttl: int = SESSION_TTL, recheck: int = SESSION_RECHECK,
+                 cache_size: int = 4096):
+        self.db = db_manager
+        self.ttl = ttl
+        self.recheck = recheck
+        # token hash -> (user dict, expires_at, checked_at)
+        self._active = LRUCache(cache_size)
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+    
+    def create_session(self, user: Dict) -> str:
+        """Persist a new session for ``user`` and return its token."""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        expires_at = int(now) + self.ttl
+        with self.db.connection() as conn:
+            conn.execute("INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, ?)",
+                         (_token_hash(token), user['id'], expires_at))
+            conn.commit()
+        self._active.put(_token_hash(token), (dict(user), expires_at, now))
+        self._maybe_purge(now)
+        return token
+    
+    def resolve(self, token: Optional[str]) -> Optional[Dict]:
+        """Return the user for a live token, or None if it is unknown or expired."""
+        if not token:
+            return None
+        key = _token_hash(token)
+        now = time.time()
+        cached = self._active.get(key)
+        if cached is not None:
+            user, expires_at, checked_at = cached
+            if expires_at > now and now - checked_at < self.recheck:
+                return dict(user)
+        
+        with self.db.connection() as conn:
+            row = conn.execute("""
+                SELECT u.id, u.username, u.email, u.first_name, u.last_name, u.is_host, s.expires_at
+                FROM sessions s
+                JOIN users u ON u.id = s.user_id
+                WHERE s.token_hash = ? AND s.expires_at > ?
+            """, (key, int(now))).fetchone()
+        
+        if row is None:
+            self._active.invalidate(key)
+            return None
+        
+        user = {
+            'id': row[0],
+            'username': row[1],
+            'email': row[2],
+            'first_name': row[3],
+            'last_name': row[4],
+            'is_host': row[5]
+        }
+        self._active.put(key, (user, row[6], now))
+        return dict(user)
+    
+    def revoke(self, token: Optional[str]):
+        if not token:
+            return
+        key = _token_hash(token)
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE token_hash = ?", (key,))
+            conn.commit()
+        self._active.invalidate(key)
+    
+    def revoke_user(self, user_id: int) -> int:
+        """End every session of a user (e.g. after a password change)."""
+        with self.db.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row[0] for row in conn.execute(
+                "SELECT token_hash FROM sessions WHERE user_id = ?", (user_id,))]
+            conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+            conn.commit()
+        self._active.invalidate_many(keys)
+        # Also catch sessions this process cached but another replica already deleted
+        self._active.invalidate_where(lambda key, entry: entry[0]['id'] == user_id)
+        return len(keys)
+    
+    def purge_expired(self) -> int:
+        """Delete expired sessions from SQLite and the local cache; returns rows deleted."""
+        now = int(time.time())
+        with self.db.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row[0] for row in conn.execute(
+                "SELECT token_hash FROM sessions WHERE expires_at <= ?", (now,))]
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.commit()
+        self._active.invalidate_many(keys)
+        self._active.invalidate_where(lambda key, entry: entry[1] <= now)
+        return len(keys)
+    
+    def _maybe_purge(self, now: float):
+        if now < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = now + PURGE_INTERVAL
+            self.purge_expired()
+        finally:
+            self._purge_lock.release()
+    
+    def cache_stats(self) -> dict:
+        return self._active.stats()
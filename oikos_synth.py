@@ -0,0 +1,203 @@
+# Oikos Synthetic Data
+# Usage: python oikos_cli.py synth --listings 100000
+import itertools
+import math
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator
+
+# (city, country, price multiplier); listed most to least popular, drawn with Zipf weights
+CITIES = [
+    ("Paris", "France", 1.3), ("London", "UK", 1.4), ("New York", "USA", 1.6),
+    ("Rome", "Italy", 1.1), ("Barcelona", "Spain", 1.0), ("Tokyo", "Japan", 1.2),
+    ("Amsterdam", "Netherlands", 1.3), ("Lisbon", "Portugal", 0.8), ("Berlin", "Germany", 0.9),
+    ("Sydney", "Australia", 1.3), ("Miami", "USA", 1.4), ("Los Angeles", "USA", 1.5),
+    ("Dubai", "UAE", 1.6), ("Singapore", "Singapore", 1.5), ("Prague", "Czechia", 0.7),
+    ("Vienna", "Austria", 0.9), ("Istanbul", "Turkey", 0.6), ("Bangkok", "Thailand", 0.5),
+    ("Mexico City", "Mexico", 0.6), ("Cape Town", "South Africa", 0.7), ("Reykjavik", "Iceland", 1.2),
+    ("Aspen", "USA", 2.0), ("Kyoto", "Japan", 1.1), ("Marrakesh", "Morocco", 0.5),
+]
+CITY_WEIGHTS = [1 / rank ** 1.1 for rank in range(1, len(CITIES) + 1)]
+
+# (type, share, guests range, price multiplier)
+PROPERTY_TYPES = [
+    ("Apartment", 45, (1, 4), 1.0), ("House", 15, (4, 10), 1.6), ("Studio", 12, (1, 2), 0.7),
+    ("Loft", 8, (2, 4), 1.1), ("Suite", 7, (2, 4), 1.5), ("Villa", 5, (6, 12), 2.8),
+    ("Cabin", 4, (2, 6), 1.0), ("Houseboat", 2, (2, 4), 1.2), ("Traditional", 2, (2, 6), 1.1),
+]
+TYPE_WEIGHTS = [share for _, share, _, _ in PROPERTY_TYPES]
+
+AMENITY_ODDS = {
+    "WiFi": 0.96, "Kitchen": 0.82, "Heating": 0.7, "TV": 0.65, "Air Conditioning": 0.5,
+    "Washer": 0.45, "Parking": 0.35, "Balcony": 0.3, "Dryer": 0.25, "Garden": 0.15,
+    "Gym": 0.1, "Pool": 0.08,
+}
+
+# Relative booking demand by month (Jan..Dec): summer peak, a December bump
+SEASONALITY = [0.6, 0.65, 0.8, 0.9, 1.0, 1.3, 1.5, 1.5, 1.1, 0.9, 0.7, 1.0]
+STAY_LENGTHS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [10, 22, 20, 14, 9, 6, 10, 5, 4]
+
+ADJECTIVES = ["Cozy", "Sunny", "Modern", "Historic", "Quiet", "Luxury", "Rustic", "Bright",
+              "Charming", "Spacious", "Stylish", "Hidden"]
+FEATURES = ["canal", "beach", "garden", "skyline", "harbour", "park", "rooftop", "market",
+            "river", "old town", "mountain", "courtyard"]
+FIRST_NAMES = ["Ana", "Ben", "Chloe", "David", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas",
+               "Kofi", "Lena", "Mateo", "Nora", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tara"]
+LAST_NAMES = ["Silva", "Müller", "Kim", "Rossi", "Nguyen", "Smith", "Garcia", "Okafor", "Sato", "Novak"]
+REVIEW_COMMENTS = {
+    5: ["Perfect stay, would book again.", "Exactly as described and spotless."],
+    4: ["Great location, a few small issues.", "Very comfortable, host was helpful."],
+    3: ["Fine for a short stay.", "Okay, but noisier than expected."],
+    2: ["Not very clean and check-in was slow.", "Photos were misleading."],
+    1: ["Would not stay here again.", "Major problems throughout the stay."],
+}
+
+SYNTH_PASSWORD = "password123"
+SYNTH_START = date(2030, 1, 1)
+
+def _chunks(rows: Iterator, size: int = 10000):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def generate_listings(rng: random.Random, count: int, host_ids: list) -> Iterator[Dict]:
+    """Listing records as accepted by oikos_import.import_properties."""
+    # A few hosts own many listings: pick hosts with Pareto weights
+    host_weights = [rng.paretovariate(1.2) for _ in host_ids]
+    hosts = rng.choices(host_ids, weights=host_weights, k=count)
+    cities = rng.choices(CITIES, weights=CITY_WEIGHTS, k=count)
+    kinds = rng.choices(PROPERTY_TYPES, weights=TYPE_WEIGHTS, k=count)
+    for i in range(count):
+        city, country, city_factor = cities[i]
+        kind, _, (low, high), kind_factor = kinds[i]
+        feature = rng.choice(FEATURES)
+        guests = rng.randint(low, high)
+        price = round(min(5000.0, 85 * city_factor * kind_factor * rng.lognormvariate(0, 0.35)
+                          * (1 + 0.08 * (guests - 1))), 0)
+        yield {
+            'host_id': hosts[i],
+            'title': f"{rng.choice(ADJECTIVES)} {feature} {kind.lower()} in {city}",
+            'description': f"{kind} near the {feature} with {rng.choice(FEATURES)} views. "
+                           f"Sleeps {guests}, close to the best of {city}.",
+            'property_type': kind, 'city': city, 'country': country,
+            'address': f"{rng.randint(1, 400)} {feature.title()} Street, {city}",
+            'price_per_night': price, 'max_guests': guests,
+            'bedrooms': max(1, math.ceil(guests / 2)), 'bathrooms': max(1, guests // 4),
+            'amenities': [name for name, odds in AMENITY_ODDS.items() if rng.random() < odds],
+        }
+
+def generate_bookings(rng: random.Random, listings: list, guest_ids: list, per_listing: float,
+                      start: date, days: int = 365) -> Iterator[tuple]:
+    """Non-overlapping bookings per listing over [start, start + days).
+    
+    ``listings`` holds (id, price, max_guests). Demand varies per listing
+    (lognormal) and by month (SEASONALITY); about 5% of bookings are cancelled.
+    """
+    mean_stay = sum(n * w for n, w in zip(STAY_LENGTHS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+    stay_cum_weights = list(itertools.accumulate(STAY_WEIGHTS))
+    end = start + timedelta(days=days)
+    for property_id, price, max_guests in listings:
+        wanted = per_listing * rng.lognormvariate(-0.18, 0.6)
+        if wanted <= 0:
+            continue
+        mean_gap = max(0.5, days / wanted - mean_stay)
+        day = start + timedelta(days=int(rng.expovariate(1 / mean_gap)))
+        while day < end:
+            nights = rng.choices(STAY_LENGTHS, cum_weights=stay_cum_weights)[0]
+            check_out = day + timedelta(days=nights)
+            # Booked a month ahead on average, at some time of day
+            booked = day - timedelta(days=1 + int(rng.expovariate(1 / 30)))
+            minute = int(rng.random() * 1440)
+            status = 'cancelled' if rng.random() < 0.05 else 'confirmed'
+            yield (property_id, guest_ids[int(rng.random() * len(guest_ids))], str(day), str(check_out),
+                   price * nights, 1 + int(rng.random() * max_guests), status,
+                   f"{booked} {minute // 60:02d}:{minute % 60:02d}:00")
+            gap = rng.expovariate(SEASONALITY[check_out.month - 1] / mean_gap)
+            day = check_out + timedelta(days=int(gap))
+
+def synthesize(db_manager, listings: int, users: int = None, bookings_per_listing: float = 6.0,
+               review_rate: float = 0.6, seed: int = 42, start: date = SYNTH_START) -> Dict:
+    """Generate a reproducible catalog into ``db_manager`` and return row counts.
+    
+    The same arguments always produce the same rows. Users default to one per
+    two listings, a tenth of them hosts; they all share SYNTH_PASSWORD.
+    Bookings cover the year from ``start``; stays that end in its first half
+    are treated as past and reviewed at ``review_rate``, with ratings drawn
+    around a per-listing quality so some listings rate consistently better.
+    """
+    from oikos_auth import hash_password
+    from oikos_import import import_properties
+    from oikos_migrations import rebuild_booking_calendar
+    rng = random.Random(seed)
+    users = users or max(10, listings // 2)
+    hosts = max(1, users // 10)
+    password_hash = hash_password(SYNTH_PASSWORD)
+    
+    with db_manager.connection() as conn:
+        first_user = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+        conn.executemany("""
+            INSERT INTO users (username, email, password_hash, first_name, last_name, phone, is_host, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(f"synth_{seed}_{i}", f"synth_{seed}_{i}@example.com", password_hash,
+               rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), None, i < hosts,
+               str(start - timedelta(days=rng.randint(30, 1500)))) for i in range(users)])
+        conn.commit()
+        user_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE id >= ? ORDER BY id", (first_user,))]
+    host_ids, guest_ids = user_ids[:hosts], user_ids[hosts:]
+    
+    with db_manager.connection() as conn:
+        first_listing = conn.execute("SELECT COALESCE(MAX(id), 0) FROM properties").fetchone()[0] + 1
+    report = import_properties(db_manager, generate_listings(rng, listings, host_ids))
+    
+    with db_manager.connection() as conn:
+        catalog = conn.execute("SELECT id, price_per_night, max_guests FROM properties WHERE id >= ? ORDER BY id",
+                               (first_listing,)).fetchall()
+        quality = {property_id: min(5.0, rng.gauss(4.3, 0.45)) for property_id, _, _ in catalog}
+        first_booking = conn.execute("SELECT COALESCE(MAX(id), 0) FROM bookings").fetchone()[0] + 1
+        booking_count = 0
+        for chunk in _chunks(generate_bookings(rng, catalog, guest_ids, bookings_per_listing, start)):
+            conn.executemany("""
+                INSERT INTO bookings (property_id, guest_id, check_in_date, check_out_date,
+                                      total_price, guest_count, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, chunk)
+            conn.commit()
+            booking_count += len(chunk)
+        rebuild_booking_calendar(conn)
+        conn.commit()
+        
+        as_of = str(start + timedelta(days=182))
+        review_count = 0
+        for low in range(first_booking, first_booking + booking_count, 100000):
+            past = conn.execute("""
+                SELECT id, property_id, guest_id, check_out_date FROM bookings
+                WHERE id >= ? AND id < ? AND status = 'confirmed' AND check_out_date < ?
+                ORDER BY id
+            """, (low, low + 100000, as_of)).fetchall()
+            rows = list(_review_rows(rng, past, quality, review_rate))
+            conn.executemany("""
+                INSERT INTO reviews (property_id, guest_id, booking_id, rating, comment, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+            review_count += len(rows)
+    
+    for table in ('properties', 'bookings', 'reviews'):
+        db_manager.notify_change(table)
+    return {'users': users, 'hosts': hosts, 'listings': report['imported'],
+            'bookings': booking_count, 'reviews': review_count}
+
+def _review_rows(rng: random.Random, past: list, quality: Dict, review_rate: float) -> Iterator[tuple]:
+    for booking_id, property_id, guest_id, check_out in past:
+        if rng.random() >= review_rate:
+            continue
+        rating = max(1, min(5, round(rng.gauss(quality[property_id], 0.8))))
+        written = date.fromisoformat(check_out) + timedelta(days=int(rng.expovariate(1 / 4)))
+        yield (property_id, guest_id, booking_id, rating, rng.choice(REVIEW_COMMENTS[rating]), f"{written} 12:00:00")
@@ -1,10 +1,12 @@
 # Oikos Utilities
+import functools
+import hashlib
+import os
+import re
 import streamlit as st
 
 # Professional CSS for modern UI
-def load_css():
-    st.markdown("""
-    <style>
+OIKOS_CSS = """
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
     
     /* Global Styles */
@@ -861,36 +863,80 @@ def load_css():
         border-top: 1px solid #333;
         color: #999;
     }
-    </style>
-    """, unsafe_allow_html=True)
+"""
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+@functools.lru_cache(maxsize=None)
+def _minified_css() -> str:
+    return minify_css(OIKOS_CSS)
+
+@functools.lru_cache(maxsize=None)
+def build_css_bundle(static_dir: str = STATIC_DIR) -> str:
+    """Write the minified stylesheet to static/oikos.<hash>.css and return its file name.
+    
+    The name changes whenever the CSS does, so browsers and proxies may cache
+    the file indefinitely.
+    """
+    css = _minified_css()
+    name = f"oikos.{hashlib.sha256(css.encode()).hexdigest()[:12]}.css"
+    path = os.path.join(static_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(css)
+        os.replace(tmp, path)
+    return name
+
+def css_markup(mode: str = None) -> str:
+    """HTML that load_css sends on every rerun.
+    
+    "inline" (default) embeds the minified stylesheet. "static" links the
+    bundle from Streamlit's static file server instead; only use it where
+    app/static serves .css as text/css (Streamlit's own handler sends
+    text/plain with nosniff, so browsers drop the stylesheet), e.g. behind
+    a reverse proxy serving static/. Set OIKOS_CSS_MODE to choose.
+    """
+    mode = mode or os.environ.get("OIKOS_CSS_MODE", "inline")
+    if mode == "static":
+        try:
+            return f'<link rel="stylesheet" href="app/static/{build_css_bundle()}">'
+        except OSError:
+            pass  # read-only checkout: fall back to inline
+    return f"<style>{_minified_css()}</style>"
+
+def load_css():
+    st.markdown(css_markup(), unsafe_allow_html=True)
 
 # Session state management
 def init_session_state():
-    if 'user' not in st.session_state:
-        st.session_state.user = None
+    # Only the opaque session token lives here; the user is resolved per rerun.
+    # It is not persisted in the browser, so a page reload means a new login.
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
     if 'page' not in st.session_state:
         st.session_state.page = 'home'
 
 # Sample data population
-def populate_sample_data():
-    """Populate the database with sample data for demonstration"""
-    from oikos_database import DatabaseManager
-    from oikos_auth import UserManager
-    from oikos_properties import PropertyManager
-    
-    db_manager = DatabaseManager()
-    user_manager = UserManager(db_manager)
-    property_manager = PropertyManager(db_manager)
-    
-    # Check if data already exists
-    conn = db_manager.get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM properties")
-    count = cursor.fetchone()[0]
-    conn.close()
-    
-    if count > 0:
-        return  # Data already exists
+def populate_sample_data(user_manager, property_manager) -> bool:
+    """Populate an empty database with sample data for demonstration.
+    
+    Called once per process from the app bootstrap (or ``oikos_cli.py seed``);
+    returns False if listings already exist.
+    """
+    with property_manager.db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM properties)")
+        if cursor.fetchone()[0]:
+            return False  # Data already exists
     
     # Create sample users
     sample_users = [
@@ -1031,5 +1077,7 @@ def populate_sample_data():
         }
     ]
     
-    for prop in sample_properties:
-        property_manager.create_property(**prop)
+    from oikos_import import import_properties
+    import_properties(property_manager.db, sample_properties)
+    
+    return True
@@ -3,13 +3,39 @@ import torchvision.models as models
 import torchvision.transforms as transforms
 from PIL import Image
 import numpy as np
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
 import os
+import threading
+import time
 import requests
 from io import BytesIO
+from torch.utils.data import DataLoader, Dataset
 import faiss
 
-# Lets load the Restnet 18 model    
-model = models.resnet18(pretrained=True).eval()
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif')
+
+# flat is exact; the others are approximate and need enough vectors to train or to pay off
+INDEX_KINDS = ('flat', 'ivf-flat', 'ivf-pq', 'hnsw')
+MIN_ANN_VECTORS = 1000
+MIN_PQ_VECTORS = 10000    # 8-bit codebooks train on 256 * 39 points
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+HNSW_M = 32
+REQUEST_TIMEOUT = 10       # seconds to fetch an image URL
+
+# CPU inference modes (see get_model). All but int8 give the same embeddings
+# up to float rounding; int8 embeddings are kept apart (see embedding_name).
+INFERENCE_MODES = ('eager', 'channels-last', 'torchscript', 'compile', 'int8')
+_inference = {'mode': os.environ.get("IMAGE_SEARCH_MODE", "eager"),
+              'shards': int(os.environ.get("IMAGE_SEARCH_SHARDS", "1"))}
+
+# The ResNet18 model is loaded on first use, once per process and mode (see get_model)
+_models = {}
+_model_lock = threading.Lock()
 
 transform = transforms.Compose([
     transforms.Resize(256), transforms.CenterCrop(224),
@@ -17,51 +43,534 @@ transform = transforms.Compose([
     transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
 ])
 
-def get_features(path_or_url):
+def configure_inference(mode=None, threads=None, interop_threads=None, shards=None):
+    """Choose the inference mode, torch's CPU thread pools and embedding processes.
+    
+    ``threads`` sizes the intra-op pool (work inside one convolution) and
+    ``interop_threads`` the pool running independent ops; torch only accepts
+    the latter before its first parallel work, so call this early. With
+    ``shards`` > 1, embed_files splits large image sets across that many
+    processes, each running its own model.
+    """
+    if mode is not None:
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode {mode!r}; expected one of {INFERENCE_MODES}")
+        _inference['mode'] = mode
+    if shards is not None:
+        _inference['shards'] = max(1, shards)
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        torch.set_num_interop_threads(interop_threads)
+
+def embedding_name():
+    """Name of the embeddings the current mode produces, for caches and stores."""
+    return "resnet18-int8" if _inference['mode'] == 'int8' else "resnet18"
+
+class ChannelsLast(torch.nn.Module):
+    """Runs a model on NHWC tensors, the layout oneDNN convolutions are fastest with on CPU."""
+    
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+    
+    def forward(self, batch):
+        return self.model(batch.contiguous(memory_format=torch.channels_last))
+
+def _build_model(mode):
+    # Lets load the Restnet 18 model
+    model = models.resnet18(weights=models.ResNet18_Weights.IMAGENET1K_V1).eval()
+    if mode == 'eager':
+        return model
+    if mode == 'int8':
+        # Dynamic quantization covers nn.Linear only, which in ResNet18 is the final fc layer
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model = ChannelsLast(model)
+    if mode == 'torchscript':
+        with torch.no_grad():
+            traced = torch.jit.trace(model, torch.zeros(1, 3, 224, 224))
+        # Freezes weights and fuses conv + batchnorm (+ relu)
+        return torch.jit.optimize_for_inference(traced)
+    if mode == 'compile':
+        # Compiles on the first forward pass (seconds), then reuses the kernels
+        return torch.compile(model)
+    return model
+
+def get_model(mode=None):
+    mode = mode or _inference['mode']
+    model = _models.get(mode)
+    if model is None:
+        with _model_lock:
+            model = _models.get(mode)
+            if model is None:
+                model = _models[mode] = _build_model(mode)
+    return model
+
+def open_image(source):
+    """An RGB PIL image from a path, an http(s) URL, raw bytes or a PIL image."""
+    if isinstance(source, Image.Image):
+        return source.convert("RGB")
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    elif source.startswith(('http://', 'https://')):
+        response = requests.get(source, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        source = BytesIO(response.content)
+    with Image.open(source) as img:
+        return img.convert("RGB")
+
+def get_features(path_or_url, image_cache=None):
+    """Embedding of one image, or None if it cannot be read.
+    
+    With an ``image_cache`` (oikos_images.ImageCache) a URL is downloaded
+    only once and its embedding is reused across calls and processes.
+    """
     try:
-        if path_or_url.startswith(('http://', 'https://')):
-            img = Image.open(BytesIO(requests.get(path_or_url).content)).convert("RGB")
-        else:
-            img = Image.open(path_or_url).convert("RGB")
-        
+        digest = None
+        if image_cache is not None and isinstance(path_or_url, str) \
+                and path_or_url.startswith(('http://', 'https://')):
+            digest = image_cache.fetch(path_or_url)
+            if digest is None:
+                raise ValueError("could not fetch image")
+            cached = image_cache.load_embedding(digest, embedding_name())
+            if cached is not None:
+                return cached
+            # The cached thumbnail is larger than the model's 256px resize
+            path_or_url = image_cache.thumbnail_path(path_or_url)
+        img = open_image(path_or_url)
         with torch.no_grad():
-            return model(transform(img).unsqueeze(0))[0].numpy()
+            vector = get_model()(transform(img).unsqueeze(0))[0].numpy()
+        if digest is not None:
+            image_cache.save_embedding(digest, embedding_name(), vector)
+        return vector
     except Exception as e:
         print(f"Error processing {path_or_url}: {e}")
         return None
 
-# now here lets make sure the image directory exists    
-image_dir = "./images"
-if not os.path.exists(image_dir):
-    print(f"Error: {image_dir} not found")
-    exit(1)
+class ImageFiles(Dataset):
+    """Decodes and preprocesses images inside DataLoader workers; unreadable images yield their error."""
+    
+    def __init__(self, sources):
+        self.sources = sources
+    
+    def __len__(self):
+        return len(self.sources)
+    
+    def __getitem__(self, i):
+        try:
+            return i, transform(open_image(self.sources[i]))
+        except Exception as e:
+            return i, str(e)
 
-#from this line 40 to 53, we are indexing the images that are in my images folder
-print("Processing images...")
-paths = [os.path.join(image_dir, f) for f in os.listdir(image_dir)]
-fileFeatures = [get_features(p) for p in paths]
-vectors = [v for v in fileFeatures if v is not None]
+def collate_images(items):
+    ok = [(i, tensor) for i, tensor in items if isinstance(tensor, torch.Tensor)]
+    failed = [(i, error) for i, error in items if not isinstance(error, torch.Tensor)]
+    batch = torch.stack([tensor for _, tensor in ok]) if ok else None
+    return [i for i, _ in ok], batch, failed
 
+def embed_files(paths, batch_size=32, workers=None):
+    """Yield (index into paths, embedding or None) with batched forward passes.
+    
+    ``paths`` may also hold URLs, raw bytes or PIL images (see open_image).
+    """
+    if not paths:
+        return
+    shards = _inference['shards']
+    if shards > 1 and len(paths) > batch_size:
+        yield from embed_sharded(paths, shards, batch_size)
+        return
+    model = get_model()
+    workers = min(4, os.cpu_count() or 1) if workers is None else workers
+    loader = DataLoader(ImageFiles(paths), batch_size=batch_size, num_workers=workers,
+                        collate_fn=collate_images)
+    with torch.inference_mode():
+        for indices, batch, failed in loader:
+            for i, error in failed:
+                print(f"Error processing {paths[i] if isinstance(paths[i], str) else f'image {i}'}: {error}")
+                yield i, None
+            if batch is not None:
+                for i, vector in zip(indices, model(batch).numpy()):
+                    yield i, vector
 
-if not vectors:
-    print("No valid images found")
-    exit(1)
+def _start_shard(mode, threads):
+    configure_inference(mode, threads, interop_threads=1, shards=1)
 
+def _embed_chunk(task):
+    start, sources, batch_size = task
+    return [(start + i, vector) for i, vector in embed_files(sources, batch_size, workers=0)]
 
-# Lets now create and populate vector index
-index = faiss.IndexFlatL2(vectors[0].shape[0])
-index.add(np.stack(vectors))
+def embed_sharded(paths, shards, batch_size=32, threads=None):
+    """embed_files spread over ``shards`` processes, each with its own model.
+    
+    Work goes out in chunks of a few batches so faster processes take more;
+    each process decodes its own images and gets an equal share of the
+    cores for torch unless ``threads`` says otherwise. Results arrive in
+    completion order.
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // shards)
+    chunk = batch_size * 4
+    tasks = [(start, paths[start:start + chunk], batch_size) for start in range(0, len(paths), chunk)]
+    # spawn: forked copies of a process that already ran torch can deadlock in its thread pools
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(shards, len(tasks)), initializer=_start_shard,
+                      initargs=(_inference['mode'], threads)) as pool:
+        for results in pool.imap_unordered(_embed_chunk, tasks):
+            yield from results
 
+class FeatureStore:
+    """Embeddings on disk: a memory-mapped features.npy plus a manifest keyed by path.
+    
+    A manifest entry records the file's mtime and size when it was embedded,
+    so update() only runs the model on new or changed images. Rows of deleted
+    images are reused, and the .npy grows by doubling. sync() does the same
+    for images that are not files in one directory, keyed by any string.
+    Switching to a mode with different embeddings (int8) re-embeds everything.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.features_path = os.path.join(directory, "features.npy")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.entries = {}   # path -> [mtime_ns, size, row]; the row is always last
+        self.failed = {}    # path -> [mtime_ns, size] of files that could not be decoded
+        self.free = []
+        self.model = embedding_name()
+        self.features = None
+        if os.path.exists(self.manifest_path) and os.path.exists(self.features_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            self.entries = manifest['entries']
+            self.failed = manifest['failed']
+            self.free = manifest['free']
+            self.model = manifest.get('model', "resnet18")
+            self.features = np.load(self.features_path, mmap_mode='r+')
+    
+    def _row_for(self, path, dim):
+        entry = self.entries.get(path)
+        if entry is not None:
+            return entry[-1]
+        if self.free:
+            return self.free.pop()
+        used = len(self.entries) + len(self.free)
+        if self.features is None or used >= len(self.features):
+            self._grow(max(1024, used * 2), dim)
+        return used
+    
+    def _grow(self, capacity, dim):
+        grown_path = self.features_path + ".tmp"
+        grown = np.lib.format.open_memmap(grown_path, mode='w+', dtype=np.float32, shape=(capacity, dim))
+        if self.features is not None:
+            grown[:len(self.features)] = self.features
+            del self.features
+        grown.flush()
+        del grown
+        os.replace(grown_path, self.features_path)
+        self.features = np.load(self.features_path, mmap_mode='r+')
+    
+    def update(self, image_dir, batch_size=32, workers=None):
+        """Embed new and changed images under image_dir and drop entries for removed ones."""
+        current = {}
+        for name in sorted(os.listdir(image_dir)):
+            path = os.path.join(image_dir, name)
+            if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+                stat = os.stat(path)
+                current[path] = [stat.st_mtime_ns, stat.st_size]
+        return self.sync(current, batch_size=batch_size, workers=workers)
+    
+    def sync(self, current, sources=None, batch_size=32, workers=None, lookup=None, on_embedded=None):
+        """Make the store hold exactly the keys of ``current`` (key -> version list).
+        
+        Keys whose version differs from the stored one are embedded from
+        ``sources[key]`` (a path or URL; the key itself by default), unless
+        ``lookup(key)`` already has their vector. ``on_embedded(key, vector)``
+        sees every vector the model computed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for path in [path for path in self.entries if path not in current]:
+            self.free.append(self.entries.pop(path)[-1])
+        self.failed = {path: key for path, key in self.failed.items() if current.get(path) == key}
+        if self.model != embedding_name():
+            self.failed, self.model = {}, embedding_name()
+            stale = list(current)
+        else:
+            stale = [path for path, key in current.items()
+                     if self.entries.get(path, [None])[:-1] != key and path not in self.failed]
+        
+        report = {'images': len(current), 'embedded': 0, 'reused': len(current) - len(stale) - len(self.failed),
+                  'failed': 0, 'skipped': len(self.failed), 'cached': 0}
+        start = time.perf_counter()
+        if lookup is not None:
+            known = {path: lookup(path) for path in stale}
+            for path, vector in known.items():
+                if vector is not None:
+                    row = self._row_for(path, vector.shape[0])
+                    self.features[row] = vector
+                    self.entries[path] = current[path] + [row]
+                    report['cached'] += 1
+            stale = [path for path in stale if known[path] is None]
+        to_embed = [sources[path] for path in stale] if sources is not None else stale
+        for i, vector in embed_files(to_embed, batch_size, workers):
+            path = stale[i]
+            if on_embedded is not None and vector is not None:
+                on_embedded(path, vector)
+            if vector is None:
+                report['failed'] += 1
+                self.failed[path] = current[path]
+                if path in self.entries:
+                    self.free.append(self.entries.pop(path)[-1])
+                continue
+            row = self._row_for(path, vector.shape[0])
+            self.features[row] = vector
+            self.entries[path] = current[path] + [row]
+            report['embedded'] += 1
+        elapsed = time.perf_counter() - start
+        report['images_per_sec'] = round(report['embedded'] / elapsed, 1) if report['embedded'] else 0.0
+        self.save()
+        return report
+    
+    def save(self):
+        if self.features is not None:
+            self.features.flush()
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'entries': self.entries, 'failed': self.failed, 'free': self.free, 'model': self.model}, f)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def vectors(self):
+        """(paths, float32 matrix) of every stored embedding, in path order."""
+        paths = sorted(self.entries)
+        if not paths:
+            return [], np.empty((0, 0), dtype=np.float32)
+        rows = [self.entries[path][-1] for path in paths]
+        return paths, np.ascontiguousarray(self.features[rows])
+
+def index_params(kind, count, dim, nlist=None, pq_m=None):
+    """Build parameters for an index kind; defaults scale with the number of vectors."""
+    if kind in ('ivf-flat', 'ivf-pq'):
+        # About 4 * sqrt(n) lists, each with enough points to train k-means (faiss wants 39+)
+        nlist = nlist or max(1, min(int(4 * math.sqrt(count)), count // 39))
+    if kind == 'ivf-pq' and not pq_m:
+        # Sub-quantizers must divide the dimension; aim for about 20 dims each
+        pq_m = max(m for m in range(1, min(dim, 64) + 1) if dim % m == 0 and dim // m >= 16)
+    return {'nlist': nlist if kind.startswith('ivf') else None, 'pq_m': pq_m if kind == 'ivf-pq' else None,
+            'hnsw_m': HNSW_M if kind == 'hnsw' else None}
+
+def build_index(vectors, kind='flat', params=None):
+    """A faiss index over vectors (float32, n x d), trained if the kind needs it."""
+    count, dim = vectors.shape
+    params = params or index_params(kind, count, dim)
+    if kind == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif kind == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, params['hnsw_m'])
+        index.hnsw.efConstruction = 80
+    elif kind in ('ivf-flat', 'ivf-pq'):
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == 'ivf-flat':
+            index = faiss.IndexIVFFlat(quantizer, dim, params['nlist'])
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, params['nlist'], params['pq_m'], 8)
+        # Train on a sample: k-means needs ~256 points per centroid at most
+        sample = vectors
+        if count > params['nlist'] * 256:
+            sample = vectors[np.random.default_rng(0).choice(count, params['nlist'] * 256, replace=False)]
+        index.train(sample)
+    else:
+        raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+    index.add(vectors)
+    return index
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Recall/speed knobs: IVF lists probed per query, HNSW candidate list size."""
+    if hasattr(index, 'nprobe'):
+        index.nprobe = nprobe or DEFAULT_NPROBE
+    if hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = ef_search or DEFAULT_EF_SEARCH
 
-# now let the user input their Getpath or url 
-query = input("\nEnter image path or URL: ").strip()
-query_vector = get_features(query)
-if query_vector is None:
-    print("Error processing query image")
-    exit(1)
+def load_index(store, kind='flat', nlist=None, pq_m=None, nprobe=None, ef_search=None):
+    """(index, paths) for the store's embeddings, reusing the index saved next to them.
+    
+    The saved index is used as is while the store is unchanged. When images
+    were added or changed, a trained IVF index keeps its centroids and only
+    re-adds the vectors, unless the collection has more than doubled since
+    training. Below MIN_ANN_VECTORS the exact flat index is used, and IVF-PQ
+    needs MIN_PQ_VECTORS to train its codebooks.
+    """
+    paths, vectors = store.vectors()
+    if not paths:
+        return None, paths
+    if kind != 'flat' and len(paths) < MIN_ANN_VECTORS:
+        kind = 'flat'
+    if kind == 'ivf-pq' and len(paths) < MIN_PQ_VECTORS:
+        kind = 'ivf-flat'
+    fingerprint = hashlib.sha1(json.dumps([store.model] + [[path] + store.entries[path] for path in paths])
+                               .encode()).hexdigest()
+    index_path = os.path.join(store.directory, f"index-{kind}.faiss")
+    meta_path = index_path + ".json"
+    
+    meta = None
+    if os.path.exists(index_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if meta is not None and nlist is None and pq_m is None:
+        # Default parameters were sized when the index was trained; keep them while it is reused
+        params = meta['params']
+    else:
+        params = index_params(kind, len(paths), vectors.shape[1], nlist, pq_m)
+    if meta is not None and meta['params'] == params and meta['fingerprint'] == fingerprint:
+        index = faiss.read_index(index_path)
+    elif meta is not None and meta['params'] == params and kind.startswith('ivf') \
+            and len(paths) <= 2 * meta['trained_on']:
+        index = faiss.read_index(index_path)
+        index.reset()
+        index.add(vectors)
+        trained_on = meta['trained_on']
+    else:
+        if meta is not None and params == meta['params'] and nlist is None and pq_m is None:
+            params = index_params(kind, len(paths), vectors.shape[1])
+        index = build_index(vectors, kind, params)
+        trained_on = len(paths)
+    
+    if meta is None or meta['fingerprint'] != fingerprint or meta['params'] != params:
+        faiss.write_index(index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({'kind': kind, 'params': params, 'fingerprint': fingerprint,
+                       'trained_on': trained_on, 'count': len(paths)}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+    set_search_params(index, nprobe, ef_search)
+    return index, paths
+
+class ImageSearch:
+    """A long-lived similarity index over a FeatureStore.
+    
+    Build it once per process: load() opens the store and its saved index,
+    index() embeds new or changed images, and query() searches many images
+    in one batch. The model is loaded on the first embedding, not on import.
+    Results are store keys: file paths, or whatever keys were given to index().
+    """
+    
+    def __init__(self, store_dir="./image_features", index_kind='flat', nlist=None, pq_m=None,
+                 nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH, batch_size=32, workers=None):
+        if index_kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {index_kind!r}; expected one of {INDEX_KINDS}")
+        self.store_dir = store_dir
+        self.index_kind = index_kind
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.batch_size = batch_size
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._store = None
+        self._searchable = (None, [])   # (faiss index, keys by index row), swapped together
+    
+    def __len__(self):
+        return len(self._searchable[1])
+    
+    def load(self):
+        """Open the feature store and its index without embedding anything."""
+        with self._lock:
+            self._store = FeatureStore(self.store_dir)
+            self._reindex()
+        return self
+    
+    def _reindex(self):
+        self._searchable = load_index(self._store, self.index_kind, self.nlist, self.pq_m,
+                                      self.nprobe, self.ef_search)
+    
+    def index(self, image_dir=None, sources=None, versions=None, lookup=None, on_embedded=None):
+        """Bring the index up to date and return the FeatureStore report.
+        
+        Either index the image files in ``image_dir``, or index ``sources``
+        (key -> path or URL) where ``versions`` (key -> list) tells when an
+        image changed; it defaults to the source itself. ``lookup`` and
+        ``on_embedded`` let a cache supply and keep vectors (see FeatureStore.sync).
+        """
+        if (image_dir is None) == (sources is None):
+            raise ValueError("Pass either image_dir or sources")
+        if image_dir is not None and not os.path.isdir(image_dir):
+            raise FileNotFoundError(f"Image directory {image_dir} not found")
+        with self._lock:
+            if self._store is None:
+                self._store = FeatureStore(self.store_dir)
+            if image_dir is not None:
+                report = self._store.update(image_dir, self.batch_size, self.workers)
+            else:
+                current = {key: list(versions[key]) if versions else [source] for key, source in sources.items()}
+                report = self._store.sync(current, sources, self.batch_size, self.workers, lookup, on_embedded)
+            if report['embedded'] or report['cached'] or report['images'] != len(self._searchable[1]) or self._searchable[0] is None:
+                self._reindex()
+        return report
+    
+    def query(self, images, k=3):
+        """Nearest stored images for each query image, as [(key, distance), ...] lists.
+        
+        ``images`` is one image or a list of them (paths, URLs, bytes or PIL
+        images); all of them go through the model in a single batch. The
+        result for an image that cannot be read is None.
+        """
+        single = not isinstance(images, (list, tuple))
+        images = [images] if single else list(images)
+        index, keys = self._searchable
+        results = [None] * len(images)
+        if index is None or not keys:
+            results = [[] for _ in images]
+            return results[0] if single else results
+        
+        embedded = list(embed_files(images, batch_size=max(1, len(images)), workers=0))
+        found = [(i, vector) for i, vector in embedded if vector is not None]
+        if found:
+            distances, rows = index.search(np.stack([vector for _, vector in found]), min(k, len(keys)))
+            for (i, _), row_distances, row_ids in zip(found, distances, rows):
+                results[i] = [(keys[row], float(distance))
+                              for row, distance in zip(row_ids, row_distances) if row >= 0]
+        return results[0] if single else results
+
+def main():
+    parser = argparse.ArgumentParser(description="Find images similar to query images")
+    parser.add_argument("query", nargs="+", help="image paths or URLs")
+    parser.add_argument("--images", default="./images", help="directory of images to index")
+    parser.add_argument("--store", default="./image_features", help="where embeddings are kept between runs")
+    parser.add_argument("-k", type=int, default=3, help="similar images per query")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="image decoding processes")
+    parser.add_argument("--index", choices=INDEX_KINDS, default='flat', help="faiss index type")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n))")
+    parser.add_argument("--pq-m", type=int, default=None, help="IVF-PQ sub-quantizers (must divide the dimension)")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="IVF lists searched per query")
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_EF_SEARCH, help="HNSW search breadth")
+    parser.add_argument("--mode", choices=INFERENCE_MODES, default=_inference['mode'], help="CPU inference mode")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads")
+    parser.add_argument("--shards", type=int, default=_inference['shards'], help="embedding processes")
+    args = parser.parse_args()
+    configure_inference(args.mode, args.threads, args.interop_threads, args.shards)
+    
+    search = ImageSearch(args.store, args.index, args.nlist, args.pq_m, args.nprobe, args.ef_search,
+                         args.batch_size, args.workers)
+    
+    # Index the images folder; only new or changed images go through the model
+    print("Processing images...")
+    try:
+        report = search.index(args.images)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    print(f"{report['images']} images: {report['embedded']} embedded ({report['images_per_sec']}/s), "
+          f"{report['reused']} reused, {report['failed']} failed, {report['skipped']} unreadable skipped")
+    if not len(search):
+        parser.error("no valid images found")
+    
+    # here we are printing each query image and the similar images
+    for query, matches in zip(args.query, search.query(args.query, args.k)):
+        print("\nQuery:", query)
+        if matches is None:
+            print("Error processing query image")
+            continue
+        print("Similar images:")
+        for path, distance in matches:
+            print(f" - {path} ({distance:.1f})")
 
-# here we are printing the query image and the similar images   
-print("\nQuery:", query)
-print("Similar images:")
-for idx in index.search(query_vector.reshape(1, -1), 3)[1][0]:
-    print(f" - {paths[idx]}") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()